@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+import ast
+import re
+
+from translation import CodeQuiltDecodeError, CodeQuiltDecoder
+
+# --- AST Decode Backend ---
+# Instead of relying on black to clean up the text decoder's crude spacing, this
+# backend builds a Python `ast.Module` and renders it with `ast.unparse`. Output is
+# deterministic and produced in-process, and the tree can be passed straight to
+# compile() without parsing the decoded source a second time.
+#
+# Plain token runs are still assembled by the text decoder (they are just Python
+# tokens) and parsed once by CPython's parser; semantic tokens are built directly
+# as AST nodes and spliced in where the text decoder left a placeholder name (a
+# whole statement, or an expression for LOG; statement-only tokens such as RETN
+# inside an expression are rejected rather than left as a dangling name).
+# Comments kept with O:[cmt=k] are dropped, since the ast module has no comment nodes.
+
+SEMANTIC_PLACEHOLDER = "__cq_semantic_{}__"
+RE_SEMANTIC_PLACEHOLDER = re.compile(r"__cq_semantic_(\d+)__")
+
+
+class _PlaceholderSplicer(ast.NodeTransformer):
+    """Replaces placeholders with the semantic nodes they stand for.
+
+    A placeholder statement becomes the token's statements; a placeholder inside
+    an expression becomes the expression of a single-expression expansion (LOG).
+    """
+
+    def __init__(self, semantic_nodes):
+        self.semantic_nodes = semantic_nodes
+        self.spliced = 0
+
+    def _placeholder(self, node):
+        if isinstance(node, ast.Name):
+            match = RE_SEMANTIC_PLACEHOLDER.fullmatch(node.id)
+            if match:
+                self.spliced += 1
+                return self.semantic_nodes[int(match.group(1))]
+        return None
+
+    def visit_Expr(self, node):
+        semantic = self._placeholder(node.value)
+        if semantic is not None:
+            return semantic[1]
+        return self.generic_visit(node)
+
+    def visit_Name(self, node):
+        semantic = self._placeholder(node)
+        if semantic is None:
+            return node
+        name, nodes = semantic
+        if not isinstance(node.ctx, ast.Load) or len(nodes) != 1 or not isinstance(nodes[0], ast.Expr):
+            raise CodeQuiltDecodeError(f"Semantic token {name} cannot be used inside an expression")
+        return nodes[0].value
+
+
+def _count_placeholders(tree):
+    """Placeholder identifiers anywhere in the tree (string constants are not identifiers)."""
+    count = 0
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant):
+            continue
+        for _, value in ast.iter_fields(node):
+            for item in (value if isinstance(value, list) else [value]):
+                if isinstance(item, str) and RE_SEMANTIC_PLACEHOLDER.fullmatch(item):
+                    count += 1
+    return count
+
+
+class AstQuiltDecoder(CodeQuiltDecoder):
+    """Decodes a CodeQuilt v0.7.1 string into a Python AST (and source via ast.unparse)."""
+
+    def __init__(self, codequilt_string, context=None):
+        super().__init__(codequilt_string, context)
+        self.semantic_nodes = [] # Placeholder index -> (token name, list of statement nodes)
+
+    def _sub_decoder(self):
+        """Decoder for a semantic body block, sharing this quilt's header maps."""
+        sub = AstQuiltDecoder(self.codequilt_string, self.context)
+        sub._use_header(self.quilt_header)
+        sub.needs_indent = True
+        return sub
+
+    def _expr(self, source, what):
+        """Parses a resolved semantic parameter as an expression node."""
+        try:
+            return ast.parse(source.strip(), mode='eval').body
+        except SyntaxError as e:
+            raise CodeQuiltDecodeError(f"Invalid {what} expression {source!r}: {e.msg}")
+
+    def _logger_call(self, level, args, keywords=()):
+        return ast.Expr(ast.Call(
+            func=ast.Attribute(value=ast.Name(self.context.corpus['c105'], ast.Load()), attr=level, ctx=ast.Load()),
+            args=list(args), keywords=list(keywords)))
+
+    def _semantic_nodes(self, name, params, body_tokens):
+        """Builds statement nodes for a semantic token, or None if it is not supported."""
+        resolved_params = [self._resolve_token_value(p) for p in params]
+
+        if name == "LOG":
+            if len(resolved_params) < 2: raise CodeQuiltDecodeError("LOG needs at least level and format string")
+            level = self.context.log_levels.get(resolved_params[0])
+            if not level: raise CodeQuiltDecodeError(f"Invalid LOG level: {resolved_params[0]}")
+            args = [self._expr(p, "LOG argument") for p in resolved_params[1:]]
+            return [self._logger_call(level, args)]
+
+        elif name == "ATTR":
+            if len(resolved_params) != 3: raise CodeQuiltDecodeError("ATTR needs object, attribute, and value")
+            obj, attr, val = resolved_params
+            attr_node = self._expr(attr, "ATTR attribute")
+            if isinstance(attr_node, ast.Constant) and isinstance(attr_node.value, str):
+                attr = attr_node.value # ATTR(c18:'_count':0) names the attribute with a string
+            if not attr.isidentifier():
+                raise CodeQuiltDecodeError(f"Invalid ATTR attribute name: {attr!r}")
+            target = ast.Attribute(value=self._expr(obj, "ATTR object"), attr=attr, ctx=ast.Store())
+            return [ast.Assign(targets=[target], value=self._expr(val, "ATTR value"))]
+
+        elif name == "RETN":
+            if len(resolved_params) != 1: raise CodeQuiltDecodeError("RETN needs one variable")
+            test = ast.Compare(left=self._expr(resolved_params[0], "RETN variable"),
+                               ops=[ast.Is()], comparators=[ast.Constant(None)])
+            return [ast.If(test=test, body=[ast.Return(ast.Constant(None))], orelse=[])]
+
+        elif name == "TRYLOG":
+            if len(resolved_params) != 2: raise CodeQuiltDecodeError("TRYLOG needs error type and variable name parameters before body")
+            if body_tokens is None: raise CodeQuiltDecodeError("TRYLOG requires a body block {}")
+            err_type, err_var = resolved_params
+            if not err_var.isidentifier():
+                raise CodeQuiltDecodeError(f"Invalid TRYLOG variable name: {err_var!r}")
+            sub = self._sub_decoder()
+            for token in body_tokens:
+                sub._process_token(token)
+            body = sub._build_module(sub.output.getvalue()).body or [ast.Pass()]
+            message = ast.JoinedStr([ast.Constant("FAIL: "),
+                                     ast.FormattedValue(ast.Name(err_var, ast.Load()), conversion=-1)])
+            handler = ast.ExceptHandler(
+                type=self._expr(err_type, "TRYLOG error type"), name=err_var,
+                body=[self._logger_call('error', [message], [ast.keyword('exc_info', ast.Constant(True))])])
+            return [ast.Try(body=body, handlers=[handler], orelse=[], finalbody=[])]
+
+        return None
+
+    def _expand_semantic_token(self, name, params, body_tokens):
+        """Records the semantic token's AST nodes and writes a placeholder statement."""
+        nodes = self._semantic_nodes(name, params, body_tokens)
+        if nodes is None:
+            return super()._expand_semantic_token(name, params, body_tokens) # Templates expand as text
+        self._write_token(SEMANTIC_PLACEHOLDER.format(len(self.semantic_nodes)), spacing='none')
+        self.semantic_nodes.append((name, nodes))
+        if name in ("RETN", "TRYLOG"):
+            # The text expansions of block tokens end their own line
+            self._write('\n')
+            self.needs_indent = True
+
+    def _build_module(self, source):
+        """Parses assembled source once and splices in semantic nodes."""
+        try:
+            tree = ast.parse(source)
+        except SyntaxError as e:
+            raise CodeQuiltDecodeError(f"Decoded token stream is not valid Python (line {e.lineno}): {e.msg}")
+        placeholders = _count_placeholders(tree)
+        splicer = _PlaceholderSplicer(self.semantic_nodes)
+        tree = splicer.visit(tree)
+        if splicer.spliced != placeholders:
+            # Left as a name the splicer cannot replace (attribute, parameter, def name...)
+            raise CodeQuiltDecodeError("Semantic token used where Python expects a name")
+        return ast.fix_missing_locations(tree)
+
+    def decode_tree(self):
+        """Decodes the quilt into an ast.Module ready for compile()."""
+        return self._build_module(super().decode(format_code=False))
+
+    def decode(self, format_code=True):
+        """Decodes the quilt and renders it with ast.unparse (no external formatter)."""
+        # format_code is accepted for compatibility; unparse output is always normalized
+        return ast.unparse(self.decode_tree()) + "\n"
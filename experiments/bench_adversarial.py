@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import math
+import random
+import sys
+import time
+import tracemalloc
+from io import StringIO
+
+from bench_quilts import best_of, make_quilt
+from translation import SPEC_VERSION, CodeQuiltDecodeError, CodeQuiltDecoder, DecodeContext
+
+# --- Adversarial Inputs: worst-case time and memory ---
+# Quilts come from an LLM, so the decoder has to treat them as untrusted: every
+# input must decode or raise CodeQuiltDecodeError, in time and memory linear in
+# its size. Each pathological case is run at doubling sizes and the growth
+# exponent (log time / log size between the smallest and largest run) is checked
+# against a budget; a random mutation fuzzer then checks that nothing else
+# (IndexError, RecursionError, hangs, ...) escapes. Everything runs under both
+# body parsers, and each case must get past the lexer (or be rejected only after
+# the lexer has read nearly all of it), so it times the path it is named after.
+
+HEADER = f"[V:{SPEC_VERSION};D:[d0=value,d1=err]]|||"
+
+CONTEXTS = {"table": DecodeContext(parser='table'), "hand": DecodeContext(parser='hand')}
+
+# Nesting stays under MAX_NESTING_DEPTH so the whole input is parsed, not cut off by the guard
+NEST = 50
+
+# name -> (body made of roughly n repeated units, parsers it applies to)
+CASES = {
+    "unterminated hatches": (lambda n: "L'{ " * n, CONTEXTS),
+    "unterminated string": (lambda n: "'" + "a" * (4 * n), CONTEXTS),
+    "escaped string": (lambda n: "'" + "\\n" * (2 * n) + "'", CONTEXTS),
+    "uppercase run": (lambda n: "D" * (4 * n), CONTEXTS),
+    "unknown NAME( calls": (lambda n: "DRCPT( " * n, CONTEXTS), # Falls through to fixed tokens
+    "nested semantics": (lambda n: ("TRYLOG(c7:d1:{" * NEST + "P N" + "})" * NEST + " N ") * (n // NEST), CONTEXTS),
+    "long parameter list": (lambda n: "LOG(i:'x'" + ":d0" * n + ") N", CONTEXTS),
+    # The grammar has no semantic tokens in parameters; only the hand lexer nests them
+    "nested parameters": (lambda n: ("RETN(" * NEST + "d0" + ")" * NEST + " N ") * (n // NEST), ("hand",)),
+    "deep indentation": (lambda n: "N > d0 = 1 " * n, CONTEXTS),
+    "newline run": (lambda n: "N" * (4 * n), CONTEXTS),
+    "deep brackets": (lambda n: "( " * n, CONTEXTS),
+    "long reference": (lambda n: "d" + "7" * (4 * n), CONTEXTS),
+    "many statements": (lambda n: "d0 = d0 + 1 N " * n, CONTEXTS),
+}
+
+MODES = {
+    "decode": lambda quilt, context: CodeQuiltDecoder(quilt, context).decode(format_code=False),
+    "validate": lambda quilt, context: CodeQuiltDecoder(quilt, context).validate(),
+    "partial": lambda quilt, context: CodeQuiltDecoder(quilt, context).decode_partial(),
+}
+
+# A case whose lexer error comes before this fraction of the body never reaches its path
+MIN_LEXER_REACH = 0.9
+
+# Alphabet for fuzz insertions: structure, refs, quotes, escapes and semantic names
+FUZZ_PIECES = ["N", ">", "<", "(", ")", "{", "}", "[", "]", ":", ",", "'", '"', "\\", "L'{", "}'",
+               "d0", "d9", "c7", "l0", "1.5", "-", "@", "b'", "RETN(", "LOG(", "TRYLOG(", "ATTR(", "\\u00", " "]
+
+
+def lexer_reach(body, context):
+    """Fraction of `body` the lexer gets through (1.0 if it lexes completely)."""
+    lexer = CodeQuiltDecoder("", context)
+    lexer.body = body
+    lexer.literal_threshold = sys.maxsize
+    try:
+        while lexer._parse_next_token() is not None:
+            pass
+    except CodeQuiltDecodeError:
+        return lexer.pos / max(len(body), 1)
+    return 1.0
+
+
+def run_guarded(fn, quilt, context):
+    """Runs one decode; returns None or a description of a disallowed outcome."""
+    try:
+        fn(quilt, context)
+    except CodeQuiltDecodeError:
+        pass
+    except Exception as e: # Anything else is a decoder bug
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def measure(fn, quilt, context, repeat):
+    """Best wall time, tracemalloc peak (bytes) and run_guarded() outcome of fn(quilt, context)."""
+    elapsed = best_of(lambda: run_guarded(fn, quilt, context), repeat)
+    tracemalloc.start()
+    bad = run_guarded(fn, quilt, context)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, bad
+
+
+def growth_exponent(sizes, values):
+    """Slope of log(value) against log(size) between the first and last size."""
+    if values[0] <= 0 or values[-1] <= 0:
+        return 0.0
+    return math.log(values[-1] / values[0]) / math.log(sizes[-1] / sizes[0])
+
+
+def run_cases(sizes, repeat, max_exponent):
+    """Runs every case in every mode under each parser; returns the number of budget violations."""
+    failures = 0
+    print(f"{'case':<22} {'parser':<6} {'mode':<9} | {'time @max':>10} {'exp':>5} | {'peak @max':>10} {'exp':>5} |")
+    for case_name, (make_body, parsers) in CASES.items():
+        for parser_name in parsers:
+            context = CONTEXTS[parser_name]
+            reach = lexer_reach(make_body(sizes[0]), context)
+            if reach < MIN_LEXER_REACH:
+                failures += 1
+                print(f"{case_name:<22} {parser_name:<6} {'-':<9} | FAIL (lexer stops at {reach:.0%} of the input)")
+                continue
+            quilts = [HEADER + make_body(n) for n in sizes]
+            for mode_name, fn in MODES.items():
+                results = [measure(fn, quilt, context, repeat) for quilt in quilts]
+                times = [t for t, _, _ in results]
+                peaks = [p for _, p, _ in results]
+                bad = next((b for _, _, b in results if b), None)
+                lengths = [len(quilt) for quilt in quilts]
+                time_exp = growth_exponent(lengths, times)
+                peak_exp = growth_exponent(lengths, peaks)
+                ok = bad is None and time_exp <= max_exponent and peak_exp <= max_exponent
+                failures += not ok
+                print(f"{case_name:<22} {parser_name:<6} {mode_name:<9} | {times[-1] * 1000:>8.1f}ms {time_exp:>5.2f} |"
+                      f" {peaks[-1] / 1024:>8.0f}KB {peak_exp:>5.2f} | {'ok' if ok else 'FAIL'}"
+                      + (f" ({bad})" if bad else ""))
+    return failures
+
+
+def mutate(rng, quilt):
+    """Applies a few random edits (delete, duplicate, insert, truncate) to a quilt."""
+    for _ in range(rng.randint(1, 4)):
+        i = rng.randrange(len(quilt) + 1)
+        j = min(len(quilt), i + rng.randint(1, 40))
+        op = rng.randrange(4)
+        if op == 0:
+            quilt = quilt[:i] + quilt[j:]
+        elif op == 1:
+            quilt = quilt[:j] + quilt[i:j] * rng.randint(1, 8) + quilt[j:]
+        elif op == 2:
+            quilt = quilt[:i] + "".join(rng.choice(FUZZ_PIECES) for _ in range(rng.randint(1, 6))) + quilt[i:]
+        else:
+            quilt = quilt[:i]
+    return quilt
+
+
+def run_fuzz(iterations, seed, time_budget):
+    """Decodes mutated quilts; returns the number of disallowed outcomes or slow inputs."""
+    rng = random.Random(seed)
+    seeds = [make_quilt(2), make_quilt(5)]
+    failures = 0
+    for i in range(iterations):
+        quilt = mutate(rng, rng.choice(seeds))
+        for parser_name, context in CONTEXTS.items():
+            for mode_name, fn in MODES.items():
+                start = time.perf_counter()
+                bad = run_guarded(fn, quilt, context)
+                elapsed = time.perf_counter() - start
+                if bad is None and elapsed > time_budget:
+                    bad = f"took {elapsed * 1000:.0f}ms"
+                if bad:
+                    failures += 1
+                    if failures <= 10:
+                        print(f"fuzz #{i} {parser_name} {mode_name}: {bad}\n  input: {quilt!r}")
+    print(f"fuzz: {iterations} mutated quilts x {len(CONTEXTS)} parsers x {len(MODES)} modes, {failures} failure(s)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worst-case time/memory checks and fuzzing for CodeQuiltDecoder.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000], help="Repetitions per case (double them)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument("--max-exponent", type=float, default=1.3, help="Allowed growth exponent for time and peak memory")
+    parser.add_argument("--fuzz", type=int, default=2000, help="Number of mutated quilts to decode")
+    parser.add_argument("--seed", type=int, default=0, help="Fuzzer seed")
+    parser.add_argument("--time-budget", type=float, default=1.0, help="Seconds allowed per fuzzed decode")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stderr(StringIO()): # Decoder warnings are expected here
+        failures = run_cases(args.sizes, args.repeat, args.max_exponent)
+        failures += run_fuzz(args.fuzz, args.seed, args.time_budget)
+    if failures:
+        print(f"{failures} budget violation(s)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import argparse
+import ast
+import contextlib
+import shutil
+import sys
+from io import StringIO
+
+from ast_backend import AstQuiltDecoder
+from bench_quilts import best_of, make_quilt
+from translation import SPEC_VERSION, CodeQuiltDecoder
+
+# --- Benchmark: text+black vs AST backend ---
+# End-to-end cost of turning a quilt into (a) formatted source and (b) a code
+# object. The text path decodes, formats with black in a subprocess, then
+# compile() re-parses the source; the AST path compiles its tree directly.
+# Both backends must first produce the same tree for every EQUIVALENCE_BODIES
+# entry and the synthetic quilts.
+
+# Semantic tokens in statement and expression position
+EQUIVALENCE_BODIES = [
+    "LOG(i:'a') N",
+    "d0 = ( LOG(i:'a') ) N",
+    "d0 = LOG(w:'b %s':d1) N",
+    "d0 . d1 ( LOG(e:'c') , [ LOG(d:'d') ] ) N",
+    "ATTR(d0:d1:3) N RETN(d1) d0 = DGET(d1:d1:'k':n) N",
+    "TRYLOG(c0:d0:{ d1 = LOG(i:'q') N }) N",
+    "d0 = '__cq_semantic_0__' N RETN(d0) N", # Placeholder text in a literal is just a string
+]
+
+
+def text_source(quilt):
+    return CodeQuiltDecoder(quilt).decode()
+
+
+def text_code(quilt):
+    return compile(text_source(quilt), "<cq>", "exec")
+
+
+def ast_source(quilt):
+    return AstQuiltDecoder(quilt).decode()
+
+
+def ast_code(quilt):
+    return compile(AstQuiltDecoder(quilt).decode_tree(), "<cq>", "exec")
+
+
+def check_equivalence():
+    """Quilts whose text and AST decodes parse to different trees."""
+    header = f"[V:{SPEC_VERSION};D:[d0=x,d1=y]]|||"
+    quilts = [header + body for body in EQUIVALENCE_BODIES] + [make_quilt(5)]
+    mismatches = []
+    for quilt in quilts:
+        text_tree = ast.dump(ast.parse(CodeQuiltDecoder(quilt).decode(format_code=False)))
+        if ast.dump(ast.parse(AstQuiltDecoder(quilt).decode())) != text_tree:
+            mismatches.append(quilt)
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the text+black and AST decode backends.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Functions per quilt")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stderr(StringIO()):
+        mismatches = check_equivalence()
+    for quilt in mismatches:
+        print(f"Error: backends decode differently: {quilt}", file=sys.stderr)
+    if mismatches:
+        sys.exit(1)
+
+    if shutil.which("black") is None:
+        print("Note: 'black' not found; the text path is measured without formatting.")
+
+    print(f"{'funcs':>6} {'quilt KB':>9} | {'text+black':>11} {'+compile':>9} | {'ast src':>9} {'ast code':>9} | {'speedup':>7}")
+    for size in args.sizes:
+        quilt = make_quilt(size)
+        with contextlib.redirect_stderr(StringIO()):
+            t_src = best_of(lambda: text_source(quilt), args.repeat)
+            t_code = best_of(lambda: text_code(quilt), args.repeat)
+            a_src = best_of(lambda: ast_source(quilt), args.repeat)
+            a_code = best_of(lambda: ast_code(quilt), args.repeat)
+        print(f"{size:>6} {len(quilt) / 1024:>9.1f} | {t_src * 1000:>9.1f}ms {t_code * 1000:>7.1f}ms |"
+              f" {a_src * 1000:>7.1f}ms {a_code * 1000:>7.1f}ms | {t_code / a_code:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
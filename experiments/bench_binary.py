@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import sys
+import zlib
+from io import StringIO
+
+from bench_quilts import best_of, make_quilt
+from quilt_binary import binary_to_codequilt, codequilt_to_binary, read_binary_quilt
+from translation import CodeQuiltDecoder
+
+# --- Benchmark: binary (.cqb) vs text quilts ---
+# Size of the stored form (also zlib-compressed, as it would sit in a cache),
+# time to get the token stream (lexing text vs reading binary) and unformatted
+# decode() time from each. Decoding still writes the same output token by token,
+# so the end-to-end speedup is bounded by _process_token(), not by lexing.
+
+
+def lex_text(quilt):
+    decoder = CodeQuiltDecoder(quilt)
+    decoder._start()
+    while decoder._parse_next_token() is not None:
+        pass
+
+
+def read_binary(data):
+    for _ in read_binary_quilt(data)[1]:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare binary and text quilts by size and decode time.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000], help="Functions per quilt")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'funcs':>6} | {'text':>8} {'binary':>8} {'ratio':>5} | {'zlib txt':>8} {'zlib bin':>8} |"
+          f" {'lex':>8} {'read':>8} {'ratio':>5} | {'decode txt':>10} {'decode bin':>10} {'ratio':>5}")
+    with contextlib.redirect_stderr(StringIO()):
+        for size in args.sizes:
+            text = make_quilt(size)
+            data = codequilt_to_binary(text)
+            expected = CodeQuiltDecoder(text).decode(format_code=False)
+            if CodeQuiltDecoder(data).decode(format_code=False) != expected or \
+                    CodeQuiltDecoder(binary_to_codequilt(data)).decode(format_code=False) != expected:
+                print(f"Error: binary quilt with {size} functions does not decode like the text form.", file=sys.stderr)
+                sys.exit(1)
+            text_bytes = text.encode('utf-8')
+            lex_time = best_of(lambda: lex_text(text), args.repeat)
+            read_time = best_of(lambda: read_binary(data), args.repeat)
+            text_time = best_of(lambda: CodeQuiltDecoder(text).decode(format_code=False), args.repeat)
+            binary_time = best_of(lambda: CodeQuiltDecoder(data).decode(format_code=False), args.repeat)
+            print(f"{size:>6} | {len(text_bytes):>8} {len(data):>8} {len(data) / len(text_bytes):>5.2f} |"
+                  f" {len(zlib.compress(text_bytes)):>8} {len(zlib.compress(data)):>8} |"
+                  f" {lex_time * 1000:>6.1f}ms {read_time * 1000:>6.1f}ms {lex_time / read_time:>4.1f}x |"
+                  f" {text_time * 1000:>8.1f}ms {binary_time * 1000:>8.1f}ms {text_time / binary_time:>4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from io import StringIO
+
+from bench_quilts import make_quilt
+from cq_import import cache_path, install, uninstall
+from translation import CodeQuiltDecoder
+
+# --- Benchmark: importing .cq modules, cold vs warm bytecode cache ---
+# Cold: no __pycache__ record, so the import hook decodes and compiles the quilt.
+# Warm: the record matches the quilt's key, so the import hashes the file and
+# unmarshals. For reference, the old deploy path decodes with black, writes a .py
+# and imports that (its own cold .pyc compile included).
+
+
+def _import_time(name, setup):
+    """Wall time of one fresh import of `name`, after running setup()."""
+    sys.modules.pop(name, None)
+    setup()
+    importlib.invalidate_caches()
+    start = time.perf_counter()
+    importlib.import_module(name)
+    return time.perf_counter() - start
+
+
+def _old_path_time(quilt, directory, name):
+    """decode() with black, write name.py, import it."""
+    start = time.perf_counter()
+    with open(os.path.join(directory, name + ".py"), 'w', encoding='utf-8') as f:
+        f.write(CodeQuiltDecoder(quilt).decode())
+    sys.modules.pop(name, None)
+    importlib.invalidate_caches()
+    importlib.import_module(name)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cold and warm imports of .cq modules.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000], help="Functions per module")
+    parser.add_argument("--repeat", type=int, default=5, help="Imports per measurement (best is reported)")
+    parser.add_argument("--no-format", action="store_true", help="Skip the decode+black+.py reference column")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="cq_import_bench_")
+    sys.path.insert(0, directory)
+    sys.dont_write_bytecode = False # The warm column needs the cache records written
+    install()
+    print(f"{'funcs':>6} {'KB':>7} | {'cold':>9} {'warm':>9} {'speedup':>7}" + ("" if args.no_format else f" | {'decode+black+.py':>16}"))
+    try:
+        with contextlib.redirect_stderr(StringIO()):
+            for size in args.sizes:
+                name = f"cq_bench_{size}"
+                quilt = make_quilt(size)
+                path = os.path.join(directory, name + ".cq")
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(quilt)
+
+                def clear_cache():
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(cache_path(path))
+
+                cold = min(_import_time(name, clear_cache) for _ in range(args.repeat))
+                warm = min(_import_time(name, lambda: None) for _ in range(args.repeat))
+                line = f"{size:>6} {len(quilt) / 1e3:>7.1f} | {cold * 1000:>7.1f}ms {warm * 1000:>7.1f}ms {cold / warm:>6.1f}x"
+                if not args.no_format:
+                    old = _old_path_time(quilt, directory, name + "_py")
+                    line += f" | {old * 1000:>14.1f}ms"
+                print(line)
+    finally:
+        uninstall()
+        sys.path.remove(directory)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
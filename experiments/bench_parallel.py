@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import os
+import sys
+from io import StringIO
+
+from bench_quilts import best_of, make_quilt
+from translation import CodeQuiltDecoder, decode_parallel
+
+# --- Benchmark: decode_parallel() on one large quilt by worker count ---
+# Splits a single multi-megabyte quilt into top-level segments and decodes them
+# on a process pool. Speedup is bounded by the serial pre-scan and stitching and
+# by the number of cores; the output is checked against serial decode() first.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure decode_parallel() speedup by process count.")
+    parser.add_argument("--functions", type=int, default=20000, help="Functions in the quilt (~230 bytes each)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Process counts to try")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument("--format", action="store_true", help="Also compare formatted output (runs black)")
+    args = parser.parse_args()
+
+    quilt = make_quilt(args.functions)
+    print(f"Quilt: {len(quilt) / 1e6:.1f} MB, {args.functions} functions, {os.cpu_count()} CPU core(s)")
+
+    with contextlib.redirect_stderr(StringIO()):
+        expected = CodeQuiltDecoder(quilt).decode(format_code=False)
+        for workers in args.workers:
+            if decode_parallel(quilt, max_workers=workers, format_code=False) != expected:
+                print(f"Error: output with {workers} worker(s) differs from serial decode().", file=sys.stderr)
+                sys.exit(1)
+
+        serial = best_of(lambda: CodeQuiltDecoder(quilt).decode(format_code=False), args.repeat)
+        print(f"{'workers':>7} | {'decode':>9} | {'MB/s':>6} | {'speedup':>7}")
+        print(f"{'serial':>7} | {serial * 1000:>7.1f}ms | {len(quilt) / 1e6 / serial:>6.2f} | {1.0:>6.2f}x")
+        for workers in args.workers:
+            elapsed = best_of(lambda: decode_parallel(quilt, max_workers=workers, format_code=False), args.repeat)
+            print(f"{workers:>7} | {elapsed * 1000:>7.1f}ms | {len(quilt) / 1e6 / elapsed:>6.2f} | {serial / elapsed:>6.2f}x")
+
+        if args.format:
+            workers = max(args.workers)
+            formatted = best_of(lambda: CodeQuiltDecoder(quilt).decode(), 1)
+            expected = CodeQuiltDecoder(quilt).decode()
+            parallel_formatted = best_of(lambda: decode_parallel(quilt, max_workers=workers), 1)
+            same = decode_parallel(quilt, max_workers=workers) == expected
+            print(f"with black: serial {formatted:.2f}s, {workers} worker(s) {parallel_formatted:.2f}s"
+                  f" ({formatted / parallel_formatted:.2f}x), identical output: {same}")
+            if not same:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import random
+import re
+import sys
+from collections import Counter
+from io import StringIO
+
+from bench_adversarial import mutate
+from bench_quilts import best_of, make_quilt
+from repack import repack_codequilt
+from translation import CodeQuiltDecodeError, CodeQuiltDecoder, DecodeContext
+
+# --- Benchmark: table-driven parser vs hand-written lexer ---
+# Conformance: both parsers lex the same bodies and their token trees (type,
+# value, position, semantic parameters and bodies) are compared. Well-formed
+# quilts must agree exactly; on fuzz-mutated ones the inputs where they differ
+# are grouped by which side rejects and why, since the table parser follows the
+# grammar where the hand lexer was lenient (escaped braces in hatches, string
+# escapes in bytes, whitespace around ':' and ')'). Throughput is lex-only.
+
+CONTEXTS = {"table": DecodeContext(parser='table'), "hand": DecodeContext(parser='hand')}
+
+RE_NUMBERS = re.compile(r"\d+")
+
+
+def lex(body, context):
+    """Token trees for a body (no header needed to lex), or the lexer's error message."""
+    decoder = CodeQuiltDecoder("", context)
+    decoder.body = body
+    decoder.literal_threshold = sys.maxsize # No threshold warnings while lexing
+    tokens = []
+    try:
+        while True:
+            token = decoder._parse_next_token()
+            if token is None:
+                return tokens
+            tokens.append(_normalized(token))
+    except CodeQuiltDecodeError as e:
+        return str(e)
+
+
+def _normalized(token):
+    """Comparable form of a token structure."""
+    params = tuple(_normalized(param) for param in token.get('params') or ())
+    body = None if token.get('body') is None else tuple(_normalized(t) for t in token['body'])
+    return (token['type'], token['value'], token['pos'], token.get('raw_code'), params, body)
+
+
+def compare(body):
+    """None if both parsers agree, else a divergence category."""
+    table, hand = lex(body, CONTEXTS["table"]), lex(body, CONTEXTS["hand"])
+    if table == hand or (isinstance(table, str) and isinstance(hand, str)):
+        return None # Same tokens, or both reject
+    if isinstance(table, str):
+        return "table rejects: " + RE_NUMBERS.sub("N", table.split(" at pos")[0])[:70]
+    if isinstance(hand, str):
+        return "hand rejects: " + RE_NUMBERS.sub("N", hand.split(" at pos")[0])[:70]
+    return "different tokens"
+
+
+def run_conformance(functions, fuzz, seed):
+    """Prints agreement on well-formed and mutated quilts; returns the well-formed divergences."""
+    well_formed = [make_quilt(n) for n in (1, 5, functions)]
+    well_formed += [repack_codequilt(quilt)[0] for quilt in well_formed]
+    bad = sum(compare(quilt.split('|||', 1)[1]) is not None for quilt in well_formed)
+    print(f"well-formed: {len(well_formed) - bad}/{len(well_formed)} quilts lex identically")
+
+    rng = random.Random(seed)
+    seeds = [make_quilt(2), make_quilt(5)]
+    categories = Counter()
+    for _ in range(fuzz):
+        body = mutate(rng, rng.choice(seeds)).split('|||', 1)[-1]
+        categories[compare(body) or "agree"] += 1
+    print(f"mutated: {categories['agree']}/{fuzz} agree (same tokens or both reject)")
+    for category, count in categories.most_common():
+        if category != "agree":
+            print(f"  {count:>6}  {category}")
+    return bad
+
+
+def run_throughput(sizes, repeat):
+    """Lex-only MB/s of both parsers."""
+    print(f"{'funcs':>6} {'MB':>6} | {'table':>11} | {'hand':>11} | {'speedup':>7}")
+    for size in sizes:
+        body = make_quilt(size).split('|||', 1)[1]
+        times = {name: best_of(lambda: lex(body, context), repeat) for name, context in CONTEXTS.items()}
+        mb = len(body) / 1e6
+        print(f"{size:>6} {mb:>6.2f} | {mb / times['table']:>6.2f} MB/s | {mb / times['hand']:>6.2f} MB/s |"
+              f" {times['hand'] / times['table']:>6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the table-driven parser with the hand-written lexer.")
+    parser.add_argument("--functions", type=int, default=200, help="Functions in the largest well-formed quilt")
+    parser.add_argument("--fuzz", type=int, default=3000, help="Number of mutated quilts to compare")
+    parser.add_argument("--seed", type=int, default=0, help="Fuzzer seed")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000], help="Functions per quilt for throughput")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stderr(StringIO()):
+        bad = run_conformance(args.functions, args.fuzz, args.seed)
+        run_throughput(args.sizes, args.repeat)
+    if bad:
+        print(f"{bad} well-formed quilt(s) lex differently", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
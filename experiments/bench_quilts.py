@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import base64
+import time
+
+from translation import SPEC_VERSION
+
+# --- Synthetic Quilts for Benchmarks ---
+# Generates well-formed quilts of arbitrary size so the bench_*.py scripts
+# measure the same kind of input. Each function body exercises refs, inline and
+# X: literals, comparisons, N>/N< indentation and semantic tokens.
+
+NAMES = ["load", "path", "data", "item", "total", "limit", "config", "values", "helper", "result_list"]
+LITERALS = ["This literal is long enough that an encoder would move it into the X: header."]
+
+
+def _encode(value):
+    return base64.b64encode(value.encode('utf-8')).decode('ascii')
+
+
+def make_header(n_functions):
+    """Header with one dynamic name per function plus the shared NAMES."""
+    d_entries = [f"d{i}={name}" for i, name in enumerate(NAMES)]
+    d_entries += [f"d{len(NAMES) + i}=func_{i}" for i in range(n_functions)]
+    x_entries = [f"l{i}={_encode(value)}" for i, value in enumerate(LITERALS)]
+    return f"[V:{SPEC_VERSION};D:[{','.join(d_entries)}];X:[{','.join(x_entries)}];O:[lth=80]]"
+
+
+def make_function(i):
+    """Body tokens for one top-level function."""
+    func = f"d{len(NAMES) + i}"
+    return (
+        f"D {func} ( d1 , d5 ) : N"
+        f" > d4 = 0 N"
+        f" RETN(d1) LOG(d:'start %s':d1) N"
+        f" d2 = [ d1 , 'item {i}' , l0 , {i}.5 ] N"
+        f" ? d5 > {i} : N"
+        f" > d4 = d4 + d5 * 2 N"
+        f" < d7 = c46 ( d2 , d1 ) N"
+        f" d9 = {{ 'total' : d4 , 'n' : c40 ( d7 , d6 ) }} N"
+        f" R d9 N"
+        f" < N"
+    )
+
+
+def make_quilt(n_functions):
+    """A quilt with `n_functions` independent top-level functions."""
+    return make_header(n_functions) + "|||" + " ".join(make_function(i) for i in range(n_functions))
+
+
+def best_of(fn, repeat=5):
+    """Minimum wall time of `repeat` calls to fn(), in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import sys
+import sysconfig
+from io import StringIO
+
+from bench_quilts import best_of, make_quilt
+from translation import CodeQuiltDecoder, decode_many, default_context
+
+# --- Benchmark: decode_many() scaling with thread count ---
+# Decodes a batch of independent quilts through one shared DecodeContext. On a
+# free-threaded build (python3.13t+) throughput should grow with threads up to the
+# core count; with the GIL it stays flat, which is the baseline to compare against.
+
+
+def gil_status():
+    """Describes whether this interpreter is running with the GIL."""
+    if not sysconfig.get_config_var("Py_GIL_DISABLED"):
+        return "GIL build"
+    if hasattr(sys, "_is_gil_enabled") and sys._is_gil_enabled():
+        return "free-threaded build, GIL re-enabled at runtime"
+    return "free-threaded build, GIL disabled"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure decode_many() throughput by thread count.")
+    parser.add_argument("--quilts", type=int, default=64, help="Quilts per batch")
+    parser.add_argument("--functions", type=int, default=50, help="Functions per quilt")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8], help="Thread counts to try")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    print(f"Python {sys.version.split()[0]} ({gil_status()})")
+    quilts = [make_quilt(args.functions) for _ in range(args.quilts)]
+    context = default_context()
+
+    with contextlib.redirect_stderr(StringIO()):
+        expected = [CodeQuiltDecoder(q, context).decode(format_code=False) for q in quilts]
+        if decode_many(quilts, max_workers=max(args.threads), context=context, format_code=False) != expected:
+            print("Error: threaded results differ from serial decoding.", file=sys.stderr)
+            sys.exit(1)
+
+        serial = best_of(lambda: [CodeQuiltDecoder(q, context).decode(format_code=False) for q in quilts], args.repeat)
+        print(f"{'threads':>7} | {'batch':>9} | {'quilts/s':>9} | {'speedup':>7}")
+        print(f"{'serial':>7} | {serial * 1000:>7.1f}ms | {args.quilts / serial:>9.1f} | {1.0:>6.2f}x")
+        for threads in args.threads:
+            elapsed = best_of(lambda: decode_many(quilts, max_workers=threads, context=context, format_code=False), args.repeat)
+            print(f"{threads:>7} | {elapsed * 1000:>7.1f}ms | {args.quilts / elapsed:>9.1f} | {serial / elapsed:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
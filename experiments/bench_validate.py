@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+from io import StringIO
+
+from bench_quilts import best_of, make_quilt
+from translation import CodeQuiltDecoder
+
+# --- Benchmark: validate() vs decode() ---
+# validate() is meant to gate LLM output before any decoding work is spent, so
+# it is compared against both a full decode() (with black) and an unformatted one.
+# Both lex the same body, and lexing is most of validate()'s time, so against
+# decode(format_code=False) expect only ~1.4-1.8x; the large ratios come from
+# skipping black.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare validate() with decode() on synthetic quilts.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Functions per quilt")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'funcs':>6} | {'validate':>9} | {'decode raw':>10} {'ratio':>6} | {'decode':>9} {'ratio':>7}")
+    for size in args.sizes:
+        quilt = make_quilt(size)
+        with contextlib.redirect_stderr(StringIO()):
+            assert CodeQuiltDecoder(quilt).validate(), "synthetic quilt should validate"
+            check = best_of(lambda: CodeQuiltDecoder(quilt).validate(), args.repeat)
+            raw = best_of(lambda: CodeQuiltDecoder(quilt).decode(format_code=False), args.repeat)
+            full = best_of(lambda: CodeQuiltDecoder(quilt).decode(), args.repeat)
+        print(f"{size:>6} | {check * 1000:>7.1f}ms | {raw * 1000:>8.1f}ms {raw / check:>5.1f}x |"
+              f" {full * 1000:>7.1f}ms {full / check:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+import argparse
+import functools
+import hashlib
+import importlib
+import importlib.abc
+import importlib.machinery
+import importlib.util
+import marshal
+import os
+import runpy
+import sys
+
+import quilt_binary
+import translation
+from quilt_binary import BINARY_EXTENSION
+from translation import CodeQuiltDecodeError, CodeQuiltDecoder, cq_tables, default_context
+
+# --- Import Hook for .cq Modules ---
+# A meta-path finder that imports `name.cq` (or a binary `name.cqb`) the way
+# Python imports `name.py`: the quilt is decoded with CodeQuiltDecoder (no black,
+# the compiler does not care about formatting) and compiled. The code object is
+# cached in __pycache__/name.cq.<tag>.pyc under a key made from the quilt bytes,
+# every DecodeContext table that shapes the output and the decoder's own source,
+# so a later import of an unchanged quilt only hashes the file and unmarshals.
+# The finder runs just before the standard PathFinder (which would otherwise
+# claim a directory holding only __init__.cq as a namespace package) and walks
+# the path in order: the first entry PathFinder resolves (a .py, an extension, a
+# zip) wins, so .py still beats a .cq on a later entry. Directory listings are
+# cached per entry by a FileFinder, as for regular modules.
+
+QUILT_EXTENSIONS = ('.cq', BINARY_EXTENSION)
+
+# Modules whose code decides what a quilt decodes to; editing any of them (a
+# decoder fix under the same SPEC_VERSION) invalidates every cached record
+DECODER_MODULES = tuple(module for module in (translation, quilt_binary, cq_tables) if module is not None)
+
+# Contexts whose table digests are kept; usually only the default one is used
+TABLE_DIGEST_CACHE_SIZE = 8
+
+_decoder_digest = None
+
+
+def decoder_digest():
+    """sha256 of the decoder sources, computed once per process."""
+    global _decoder_digest
+    if _decoder_digest is None:
+        digest = hashlib.sha256()
+        for module in DECODER_MODULES:
+            with open(module.__file__, 'rb') as f:
+                digest.update(f.read())
+        _decoder_digest = digest.digest()
+    return _decoder_digest
+
+
+@functools.lru_cache(maxsize=TABLE_DIGEST_CACHE_SIZE) # Contexts are immutable
+def _table_digest(context):
+    tables = (
+        context.spec_version, context.parser, sorted(context.corpus.items()), sorted(context.fixed_tokens.items()),
+        sorted(context.indent_tokens.items()), sorted(context.line_start_kinds.items()),
+        sorted(context.log_levels.items()), sorted(context.semantic_names), sorted(context.semantic_templates.items()),
+    )
+    return hashlib.sha256(decoder_digest() + repr(tables).encode('utf-8')).digest()
+
+
+def cache_key(data, context):
+    """Bytecode cache key for quilt bytes decoded with `context`."""
+    digest = hashlib.sha256(_table_digest(context))
+    digest.update(data)
+    return digest.digest()
+
+
+def cache_path(path):
+    """__pycache__ location for a quilt; distinct from the .pyc of a same-named .py."""
+    return importlib.util.cache_from_source(path + ".py")
+
+
+class CodeQuiltLoader(importlib.abc.FileLoader):
+    """Loads one .cq/.cqb file, reusing cached bytecode when the key matches."""
+
+    def __init__(self, fullname, path, context=None):
+        super().__init__(fullname, path)
+        self.context = context
+
+    def is_package(self, fullname):
+        return os.path.splitext(os.path.basename(self.path))[0] == "__init__"
+
+    def _decode(self, data):
+        quilt = data if self.path.endswith(BINARY_EXTENSION) else data.decode('utf-8')
+        try:
+            return CodeQuiltDecoder(quilt, self.context or default_context()).decode(format_code=False)
+        except (CodeQuiltDecodeError, UnicodeDecodeError) as e:
+            raise ImportError(f"Cannot decode {self.path}: {e}", name=self.name, path=self.path) from e
+
+    def get_source(self, fullname):
+        return self._decode(self.get_data(self.path))
+
+    def get_code(self, fullname):
+        data = self.get_data(self.path)
+        key = cache_key(data, self.context or default_context())
+        pyc = cache_path(self.path)
+        try:
+            with open(pyc, 'rb') as f:
+                record = f.read()
+        except OSError:
+            record = None
+        prefix = importlib.util.MAGIC_NUMBER + key
+        if record and record.startswith(prefix):
+            try:
+                return marshal.loads(record[len(prefix):])
+            except (EOFError, ValueError, TypeError):
+                pass # Corrupt record; decode and overwrite it
+
+        code = compile(self._decode(data), self.path, 'exec', dont_inherit=True)
+        if not sys.dont_write_bytecode:
+            self._write_cache(pyc, prefix + marshal.dumps(code))
+        return code
+
+    @staticmethod
+    def _write_cache(pyc, record):
+        # Write-then-rename so a concurrent import never reads a partial record;
+        # an unwritable directory just means no cache, as for .py modules
+        tmp = f"{pyc}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(pyc), exist_ok=True)
+            with open(tmp, 'wb') as f:
+                f.write(record)
+            os.replace(tmp, pyc)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+
+class CodeQuiltFinder(importlib.abc.MetaPathFinder):
+    """Finds `name.cq`/`name.cqb` modules and `name/__init__.cq` packages on the import path."""
+
+    def __init__(self, context=None):
+        self.context = context
+        self._finders = {} # path entry -> FileFinder for its quilts, or None if it is not a directory
+
+    def invalidate_caches(self):
+        self._finders.clear()
+
+    def _quilt_finder(self, entry):
+        if entry == '':
+            entry = os.getcwd()
+        try:
+            return self._finders[entry]
+        except KeyError:
+            pass
+        finder = None
+        if isinstance(entry, str) and os.path.isdir(entry):
+            loader = functools.partial(CodeQuiltLoader, context=self.context)
+            finder = importlib.machinery.FileFinder(entry, (loader, QUILT_EXTENSIONS))
+        self._finders[entry] = finder
+        return finder
+
+    def find_spec(self, fullname, path, target=None):
+        for entry in (sys.path if path is None else path):
+            spec = importlib.machinery.PathFinder.find_spec(fullname, [entry], target)
+            if spec is not None and spec.loader is not None:
+                return spec # A regular or zipped module comes first on the path
+            finder = self._quilt_finder(entry)
+            spec = finder.find_spec(fullname, target) if finder else None
+            if spec is not None and spec.loader is not None: # Not a bare directory (namespace portion)
+                spec.cached = cache_path(spec.origin)
+                return spec
+        return None
+
+
+def install(context=None):
+    """Adds the .cq finder to sys.meta_path (once, ahead of PathFinder) and returns it."""
+    for finder in sys.meta_path:
+        if isinstance(finder, CodeQuiltFinder):
+            return finder
+    finder = CodeQuiltFinder(context)
+    position = len(sys.meta_path)
+    if importlib.machinery.PathFinder in sys.meta_path:
+        position = sys.meta_path.index(importlib.machinery.PathFinder)
+    sys.meta_path.insert(position, finder)
+    return finder
+
+
+def uninstall():
+    """Removes any .cq finder from sys.meta_path."""
+    sys.meta_path[:] = [finder for finder in sys.meta_path if not isinstance(finder, CodeQuiltFinder)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a .cq module (or import it to warm its bytecode cache).")
+    parser.add_argument("module", help="Dotted module name, found as name.cq / name.cqb on sys.path")
+    parser.add_argument("--path", action="append", default=[], help="Directory to add to sys.path (repeatable)")
+    parser.add_argument("--import-only", action="store_true", help="Import instead of running as __main__")
+    args = parser.parse_args()
+
+    sys.path[:0] = [os.path.abspath(directory) for directory in args.path]
+    install()
+    try:
+        if args.import_only:
+            importlib.import_module(args.module)
+        else:
+            runpy.run_module(args.module, run_name="__main__", alter_sys=True)
+    except ImportError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
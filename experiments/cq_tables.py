@@ -0,0 +1,188 @@
+# Generated by gen_parser.py from codequilt-0.7.1.ebnf; do not edit.
+# Regenerate with: python gen_parser.py <grammar.ebnf>
+
+GRAMMAR = 'codequilt-0.7.1.ebnf'
+GRAMMAR_SHA256 = '1583c3ec92cf12c9aab445604fd116ac4c00ad5888ab9175be63d20734b3d3a4'
+
+# First char of a body token -> token kinds to try, in order
+DISPATCH = {
+    '!': ('fixed_token',),
+    '"': ('string_literal',),
+    '%': ('fixed_token',),
+    '&': ('fixed_token',),
+    "'": ('string_literal',),
+    '(': ('fixed_token',),
+    ')': ('fixed_token',),
+    '*': ('fixed_token',),
+    '+': ('number_literal', 'fixed_token'),
+    ',': ('fixed_token',),
+    '-': ('number_literal', 'fixed_token'),
+    '.': ('fixed_token',),
+    '/': ('fixed_token',),
+    '0': ('number_literal',),
+    '1': ('number_literal',),
+    '2': ('number_literal',),
+    '3': ('number_literal',),
+    '4': ('number_literal',),
+    '5': ('number_literal',),
+    '6': ('number_literal',),
+    '7': ('number_literal',),
+    '8': ('number_literal',),
+    '9': ('number_literal',),
+    ':': ('fixed_token',),
+    ';': ('fixed_token',),
+    '<': ('fixed_token',),
+    '=': ('fixed_token',),
+    '>': ('fixed_token',),
+    '?': ('fixed_token',),
+    '@': ('fixed_token',),
+    'A': ('semantic_token', 'fixed_token'),
+    'B': ('semantic_token', 'fixed_token'),
+    'C': ('semantic_token', 'fixed_token'),
+    'D': ('semantic_token', 'fixed_token'),
+    'E': ('semantic_token', 'fixed_token'),
+    'F': ('semantic_token',),
+    'G': ('semantic_token', 'fixed_token'),
+    'H': ('semantic_token',),
+    'I': ('semantic_token',),
+    'J': ('semantic_token', 'fixed_token'),
+    'K': ('semantic_token', 'fixed_token'),
+    'L': ('semantic_token', 'escape_hatch', 'fixed_token'),
+    'M': ('semantic_token', 'fixed_token'),
+    'N': ('semantic_token', 'fixed_token'),
+    'O': ('semantic_token',),
+    'P': ('semantic_token', 'fixed_token'),
+    'Q': ('semantic_token', 'fixed_token'),
+    'R': ('semantic_token', 'fixed_token'),
+    'S': ('semantic_token', 'fixed_token'),
+    'T': ('semantic_token', 'fixed_token'),
+    'U': ('semantic_token', 'fixed_token'),
+    'V': ('semantic_token',),
+    'W': ('semantic_token', 'fixed_token'),
+    'X': ('semantic_token', 'fixed_token'),
+    'Y': ('semantic_token', 'fixed_token'),
+    'Z': ('semantic_token', 'fixed_token'),
+    '[': ('fixed_token',),
+    ']': ('fixed_token',),
+    '^': ('fixed_token',),
+    'a': ('semantic_token',),
+    'b': ('semantic_token', 'bytes_literal'),
+    'c': ('corpus_ref', 'semantic_token'),
+    'd': ('dynamic_ref', 'semantic_token'),
+    'e': ('semantic_token',),
+    'f': ('semantic_token', 'boolean_literal', 'fixed_token'),
+    'g': ('semantic_token',),
+    'h': ('semantic_token',),
+    'i': ('semantic_token',),
+    'j': ('semantic_token',),
+    'k': ('semantic_token',),
+    'l': ('literal_ref', 'semantic_token'),
+    'm': ('semantic_token',),
+    'n': ('semantic_token', 'null_literal', 'fixed_token'),
+    'o': ('semantic_token',),
+    'p': ('semantic_token',),
+    'q': ('semantic_token',),
+    'r': ('semantic_token',),
+    's': ('semantic_token',),
+    't': ('semantic_token', 'boolean_literal', 'fixed_token'),
+    'u': ('semantic_token',),
+    'v': ('semantic_token',),
+    'w': ('semantic_token',),
+    'x': ('semantic_token',),
+    'y': ('semantic_token',),
+    'z': ('semantic_token',),
+    '{': ('fixed_token',),
+    '|': ('fixed_token',),
+    '}': ('fixed_token',),
+    '~': ('fixed_token',),
+}
+
+# First char of a semantic token parameter -> token kinds to try
+PARAM_DISPATCH = {
+    '!': ('fixed_token',),
+    '"': ('string_literal',),
+    '%': ('fixed_token',),
+    '&': ('fixed_token',),
+    "'": ('string_literal',),
+    '(': ('fixed_token',),
+    ')': ('fixed_token',),
+    '*': ('fixed_token',),
+    '+': ('number_literal', 'fixed_token'),
+    ',': ('fixed_token',),
+    '-': ('number_literal', 'fixed_token'),
+    '.': ('fixed_token',),
+    '/': ('fixed_token',),
+    '0': ('number_literal',),
+    '1': ('number_literal',),
+    '2': ('number_literal',),
+    '3': ('number_literal',),
+    '4': ('number_literal',),
+    '5': ('number_literal',),
+    '6': ('number_literal',),
+    '7': ('number_literal',),
+    '8': ('number_literal',),
+    '9': ('number_literal',),
+    ':': ('fixed_token',),
+    ';': ('fixed_token',),
+    '<': ('fixed_token',),
+    '=': ('fixed_token',),
+    '>': ('fixed_token',),
+    '?': ('fixed_token',),
+    '@': ('fixed_token',),
+    'A': ('fixed_token',),
+    'B': ('fixed_token',),
+    'C': ('fixed_token',),
+    'D': ('fixed_token',),
+    'E': ('fixed_token',),
+    'G': ('fixed_token',),
+    'J': ('fixed_token',),
+    'K': ('fixed_token',),
+    'L': ('fixed_token',),
+    'M': ('fixed_token',),
+    'N': ('fixed_token',),
+    'P': ('fixed_token',),
+    'Q': ('fixed_token',),
+    'R': ('fixed_token',),
+    'S': ('fixed_token',),
+    'T': ('fixed_token',),
+    'U': ('fixed_token',),
+    'W': ('fixed_token',),
+    'X': ('fixed_token',),
+    'Y': ('fixed_token',),
+    'Z': ('fixed_token',),
+    '[': ('fixed_token',),
+    ']': ('fixed_token',),
+    '^': ('fixed_token',),
+    'b': ('bytes_literal',),
+    'c': ('corpus_ref',),
+    'd': ('dynamic_ref',),
+    'f': ('boolean_literal', 'fixed_token'),
+    'l': ('literal_ref',),
+    'n': ('null_literal', 'fixed_token'),
+    't': ('boolean_literal', 'fixed_token'),
+    '{': ('fixed_token',),
+    '|': ('fixed_token',),
+    '}': ('fixed_token',),
+    '~': ('fixed_token',),
+}
+
+# Token kind -> regex (semantic_token matches NAME and '(')
+PATTERNS = {
+    'corpus_ref': 'c[0-9]+',
+    'dynamic_ref': 'd[0-9]+',
+    'literal_ref': 'l[0-9]+',
+    'semantic_token': '[a-zA-Z][a-zA-Z0-9_]{0,31}\\(',
+    'escape_hatch': "L'\\{[^{}\\\\]*(?:\\\\[\\{\\}\\\\][^{}\\\\]*)*\\}'",
+    'number_literal': '[\\+\\-]?[0-9]+(?:\\.[0-9]+)?',
+    'string_literal': '(?:\'[^\'\\\\]*(?:\\\\(?:\'|"|\\\\|n|t|r|b|f|u[0-9a-fA-F][0-9a-fA-F][0-9a-fA-F][0-9a-fA-F])[^\'\\\\]*)*\'|"[^"\\\\]*(?:\\\\(?:\'|"|\\\\|n|t|r|b|f|u[0-9a-fA-F][0-9a-fA-F][0-9a-fA-F][0-9a-fA-F])[^"\\\\]*)*")',
+    'bytes_literal': 'b(?:\'[^\'\\\\]*(?:\\\\(?:\'|"|\\\\|n|t|r|b|f|u[0-9a-fA-F][0-9a-fA-F][0-9a-fA-F][0-9a-fA-F])[^\'\\\\]*)*\'|"[^"\\\\]*(?:\\\\(?:\'|"|\\\\|n|t|r|b|f|u[0-9a-fA-F][0-9a-fA-F][0-9a-fA-F][0-9a-fA-F])[^"\\\\]*)*")',
+    'boolean_literal': '[tf]',
+    'null_literal': 'n',
+}
+
+# Chars that are a structure token / decorator prefix at line start, a fixed token elsewhere
+LINE_START = {
+    '<': 'structure',
+    '>': 'structure',
+    '@': 'decorator_prefix',
+}
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+
+from translation import FIXED_TOKEN_MAP, INDENT_TOKENS
+
+# --- Parser Table Generator ---
+# Build step for the table-driven body parser: reads codequilt-<version>.ebnf,
+# turns every lexical token production into a regex (rules are inlined; the
+# grammar's body tokens are regular apart from semantic-token, which recurses
+# through body-tokens), computes FIRST sets and writes cq_tables.py with
+#   DISPATCH        first char -> token kinds to try, in order
+#   PARAM_DISPATCH  the same for semantic token parameters
+#   PATTERNS        token kind -> regex source
+#   LINE_START      chars whose meaning changes at the start of a line
+# CodeQuiltDecoder walks these tables with one regex match per token, so a parse
+# is linear in the body size. Rerun after editing the grammar:
+#   python gen_parser.py ../codequilt-0.7.1.ebnf
+
+DEFAULT_GRAMMAR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'codequilt-0.7.1.ebnf')
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cq_tables.py')
+
+# Body productions -> decoder token kinds, in the order a char is tried (ordered
+# choice: more specific productions before the profile's single-char tokens)
+TOKEN_KINDS = [
+    ('corpus-ref', 'corpus_ref'),
+    ('dynamic-ref', 'dynamic_ref'),
+    ('literal-ref', 'literal_ref'),
+    ('semantic-token', 'semantic_token'),
+    ('escape-hatch-token', 'escape_hatch'),
+    ('number-literal', 'number_literal'),
+    ('string-literal', 'string_literal'),
+    ('bytes-literal', 'bytes_literal'),
+    ('boolean-literal', 'boolean_literal'),
+    ('null-literal', 'null_literal'),
+    ('decorator-prefix', 'decorator_prefix'),
+    ('structure-token', 'fixed_token'),
+    ('fixed-keyword-operator-token', 'fixed_token'),
+]
+
+PRODUCTION_KINDS = dict(TOKEN_KINDS)
+
+# Productions that only win over a fixed token with the same char at line start
+LINE_START_PRODUCTIONS = {'structure-token': 'structure', 'decorator-prefix': 'decorator_prefix'}
+
+# Productions this profile (Python) does not use
+EXCLUDED_PRODUCTIONS = {'preprocessor-token'}
+
+# Rules the grammar only describes in a comment: rule -> regex character class
+ABSTRACT_RULES = {
+    'non-apostrophe-non-backslash-char': "[^'\\\\]",
+    'non-quote-non-backslash-char': '[^"\\\\]',
+    'non-brace-non-backslash-char': '[^{}\\\\]',
+    'printable-char': '[ -~]',
+}
+
+# fixed-keyword-operator-token is "defined by V:/L: profile": the decoder's map
+PROFILE_RULES = {'fixed-keyword-operator-token'}
+
+SEMANTIC_NAME_MAX = 32 # Same bound as translation.RE_SEMANTIC_START (keeps long capital runs linear)
+
+RE_EBNF_TOKEN = re.compile(r"""
+    (?P<space>\s+|\(\*.*?\*\)|/\*.*?\*/)
+  | (?P<define>::=)
+  | (?P<range>\.\.)
+  | (?P<string>"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')
+  | (?P<name>[A-Za-z][A-Za-z0-9-]*)
+  | (?P<op>[|()?*+])
+""", re.VERBOSE | re.DOTALL)
+
+
+class GrammarError(Exception):
+    """The grammar cannot be turned into tables."""
+
+
+# --- EBNF Reader ---
+
+def _lex_ebnf(text):
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        match = RE_EBNF_TOKEN.match(text, pos)
+        if match is None:
+            raise GrammarError(f"Unexpected character {text[pos]!r} in grammar at offset {pos}")
+        pos = match.end()
+        kind = match.lastgroup
+        if kind == 'string':
+            value = re.sub(r"\\(.)", r"\1", match.group(0)[1:-1])
+            tokens.append(('string', value))
+        elif kind != 'space':
+            tokens.append((kind, match.group(0)))
+    return tokens
+
+
+def parse_ebnf(text):
+    """Returns {rule name: expression}; expressions are nested tuples."""
+    tokens = _lex_ebnf(text)
+    rules = {}
+    i = 0
+    while i < len(tokens):
+        if tokens[i][0] != 'name' or i + 1 >= len(tokens) or tokens[i + 1][0] != 'define':
+            raise GrammarError(f"Expected 'rule ::=' at {tokens[i][1]!r}")
+        name = tokens[i][1]
+        end = i + 2
+        while end < len(tokens) and not (tokens[end][0] == 'name' and end + 1 < len(tokens) and tokens[end + 1][0] == 'define'):
+            end += 1
+        body = tokens[i + 2:end]
+        rules[name] = ('abstract', name) if not body else _Expression(body).parse()
+        i = end
+    return rules
+
+
+class _Expression:
+    """Recursive-descent reader for one rule's right-hand side."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def parse(self):
+        expr = self._alternatives()
+        if self.pos != len(self.tokens):
+            raise GrammarError(f"Unexpected {self.tokens[self.pos][1]!r} in rule")
+        return expr
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _alternatives(self):
+        options = [self._sequence()]
+        while self._peek() == ('op', '|'):
+            self.pos += 1
+            options.append(self._sequence())
+        return options[0] if len(options) == 1 else ('alt', options)
+
+    def _sequence(self):
+        items = []
+        while self._peek()[0] in ('string', 'name') or self._peek() == ('op', '('):
+            items.append(self._repeat())
+        if not items:
+            raise GrammarError("Empty alternative in rule")
+        return items[0] if len(items) == 1 else ('seq', items)
+
+    def _repeat(self):
+        kind, value = self._peek()
+        self.pos += 1
+        if kind == 'string':
+            if self._peek()[0] == 'range':
+                self.pos += 2
+                item = ('range', value, self.tokens[self.pos - 1][1])
+            else:
+                item = ('lit', value)
+        elif kind == 'name':
+            item = ('ref', value)
+        else:
+            item = self._alternatives()
+            if self._peek() != ('op', ')'):
+                raise GrammarError("Missing ')' in rule")
+            self.pos += 1
+        while self._peek()[1] in ('?', '*', '+') and self._peek()[0] == 'op':
+            item = ({'?': 'opt', '*': 'star', '+': 'plus'}[self._peek()[1]], item)
+            self.pos += 1
+        return item
+
+
+# --- Regexes and FIRST Sets ---
+
+class Grammar:
+    def __init__(self, rules, fixed_tokens):
+        self.rules = rules
+        self.fixed_tokens = fixed_tokens
+
+    def _rule(self, name):
+        if name not in self.rules:
+            raise GrammarError(f"Undefined rule {name!r}")
+        return self.rules[name]
+
+    def char_class(self, expr, active=()):
+        """Contents of a [...] class if expr matches exactly one char from a set, else None."""
+        kind = expr[0]
+        if kind == 'lit' and len(expr[1]) == 1:
+            return re.escape(expr[1]).replace(']', '\\]')
+        if kind == 'range':
+            return f"{re.escape(expr[1])}-{re.escape(expr[2])}"
+        if kind == 'ref' and expr[1] not in active and expr[1] not in ABSTRACT_RULES:
+            return self.char_class(self._rule(expr[1]), active + (expr[1],))
+        if kind == 'alt':
+            parts = [self.char_class(option, active) for option in expr[1]]
+            return ''.join(parts) if None not in parts else None
+        return None
+
+    def regex(self, expr, active=()):
+        """Regex source for a regular expression tree; inlines referenced rules."""
+        char_class = self.char_class(expr, active)
+        if char_class is not None and expr[0] != 'lit':
+            return char_class if _is_atom(char_class) else f"[{char_class}]"
+        kind = expr[0]
+        if kind == 'lit':
+            return re.escape(expr[1])
+        if kind == 'ref':
+            name = expr[1]
+            if name in ABSTRACT_RULES:
+                return ABSTRACT_RULES[name]
+            if name in active:
+                raise GrammarError(f"Rule {name!r} is recursive, not a lexical token")
+            return self.regex(self._rule(name), active + (name,))
+        if kind == 'abstract':
+            raise GrammarError(f"Rule {expr[1]!r} has no definition usable in a regex")
+        if kind == 'seq':
+            return ''.join(self.regex(item, active) for item in expr[1])
+        if kind == 'alt':
+            return '(?:' + '|'.join(self.regex(option, active) for option in expr[1]) + ')'
+        if kind == 'star':
+            unrolled = self._unrolled_star(expr[1], active)
+            if unrolled is not None:
+                return unrolled
+        suffix = {'opt': '?', 'star': '*', 'plus': '+'}[kind]
+        inner = self.regex(expr[1], active)
+        return f"{inner}{suffix}" if _is_atom(inner) else f"(?:{inner}){suffix}"
+
+    def _unrolled_star(self, expr, active):
+        """(X | C)* as C*(?:XC*)* when C is a char class no X can start with (no per-char alternation)."""
+        while expr[0] == 'ref' and expr[1] not in ABSTRACT_RULES and expr[1] not in active:
+            active += (expr[1],)
+            expr = self._rule(expr[1])
+        if expr[0] != 'alt':
+            return None
+        options = [(option, self.regex(option, active)) for option in expr[1]]
+        classes = [src for _, src in options if src.startswith('[') and _is_atom(src)]
+        if len(classes) != 1:
+            return None
+        others = [(option, src) for option, src in options if src != classes[0]]
+        class_re = re.compile(classes[0])
+        if any(class_re.match(char) for option, _ in others for char in self.first(option, active)):
+            return None
+        rest = '|'.join(src for _, src in others)
+        rest = rest if len(others) == 1 else f"(?:{rest})"
+        return f"{classes[0]}*(?:{rest}{classes[0]}*)*"
+
+    def nullable(self, expr, active=()):
+        kind = expr[0]
+        if kind in ('opt', 'star'):
+            return True
+        if kind == 'lit':
+            return not expr[1]
+        if kind == 'plus':
+            return self.nullable(expr[1], active)
+        if kind == 'seq':
+            return all(self.nullable(item, active) for item in expr[1])
+        if kind == 'alt':
+            return any(self.nullable(option, active) for option in expr[1])
+        if kind == 'ref' and expr[1] not in active and expr[1] not in ABSTRACT_RULES and expr[1] not in PROFILE_RULES:
+            return self.nullable(self._rule(expr[1]), active + (expr[1],))
+        return False
+
+    def first(self, expr, active=()):
+        """FIRST set (chars) of an expression."""
+        kind = expr[0]
+        if kind == 'lit':
+            return set(expr[1][:1])
+        if kind == 'range':
+            return {chr(c) for c in range(ord(expr[1]), ord(expr[2]) + 1)}
+        if kind == 'ref':
+            name = expr[1]
+            if name in PROFILE_RULES:
+                return set(self.fixed_tokens)
+            if name in active or name in ABSTRACT_RULES:
+                return set()
+            return self.first(self._rule(name), active + (name,))
+        if kind == 'alt':
+            return set().union(*(self.first(option, active) for option in expr[1]))
+        if kind == 'seq':
+            chars = set()
+            for item in expr[1]:
+                chars |= self.first(item, active)
+                if not self.nullable(item, active):
+                    break
+            return chars
+        if kind in ('opt', 'star', 'plus'):
+            return self.first(expr[1], active)
+        return set()
+
+    def bounded_name(self, rule, limit):
+        """Regex for an identifier-shaped rule (X Y*) with at most `limit` chars."""
+        expr = self._rule(rule)
+        while expr[0] == 'ref':
+            expr = self._rule(expr[1])
+        if expr[0] != 'seq' or len(expr[1]) != 2 or expr[1][1][0] != 'star':
+            raise GrammarError(f"Rule {rule!r} is not of the form first (rest)*")
+        return f"{self.regex(expr[1][0])}{self.regex(expr[1][1][1])}{{0,{limit - 1}}}"
+
+
+def build_tables(grammar):
+    """Computes the dispatch tables and token regexes for CodeQuiltDecoder."""
+    listed = _alternatives(grammar, 'token')
+    known = set(PRODUCTION_KINDS) | EXCLUDED_PRODUCTIONS | {'literal-token'}
+    if listed - known:
+        raise GrammarError(f"token alternatives without a decoder kind: {sorted(listed - known)}")
+
+    fixed = set(grammar.fixed_tokens)
+    dispatch = {}
+    line_start = {}
+    patterns = {}
+    for production, kind in TOKEN_KINDS:
+        if production not in listed:
+            raise GrammarError(f"Grammar has no token alternative {production!r}")
+        chars = grammar.first(('ref', production))
+        if production in LINE_START_PRODUCTIONS:
+            # Profile chars that mean something else at line start (N> / N< / N@)
+            conflicts = chars & fixed & (set(INDENT_TOKENS) if production == 'structure-token' else chars)
+            for char in conflicts:
+                line_start[char] = LINE_START_PRODUCTIONS[production]
+            chars -= fixed # Elsewhere in a line these are ordinary fixed tokens
+        for char in sorted(chars):
+            if kind not in dispatch.setdefault(char, []):
+                dispatch[char].append(kind)
+        if production == 'semantic-token':
+            patterns[kind] = grammar.bounded_name('semantic-token-name', SEMANTIC_NAME_MAX) + re.escape('(')
+        elif kind != 'fixed_token' and production not in LINE_START_PRODUCTIONS:
+            patterns[kind] = grammar.regex(('ref', production))
+
+    param_productions = _alternatives(grammar, 'parameter')
+    param_kinds = {kind for production, kind in TOKEN_KINDS if production in param_productions}
+    if 'fixed-keyword-operator-token' in param_productions:
+        param_kinds.add('fixed_token')
+    param_chars = grammar.first(('ref', 'parameter'))
+    param_dispatch = {char: tuple(kind for kind in kinds if kind in param_kinds)
+                      for char, kinds in dispatch.items() if char in param_chars}
+    return {
+        'DISPATCH': {char: tuple(kinds) for char, kinds in sorted(dispatch.items())},
+        'PARAM_DISPATCH': {char: kinds for char, kinds in sorted(param_dispatch.items()) if kinds},
+        'PATTERNS': patterns,
+        'LINE_START': dict(sorted(line_start.items())),
+    }
+
+
+def _alternatives(grammar, rule):
+    """Productions a rule is a choice between; grouping rules (literal-token) are flattened."""
+    expr = grammar._rule(rule)
+    names = set()
+    for option in (expr[1] if expr[0] == 'alt' else [expr]):
+        if option[0] != 'ref':
+            continue
+        names.add(option[1])
+        inner = grammar._rule(option[1])
+        if option[1] not in PRODUCTION_KINDS and inner[0] == 'alt' and all(o[0] == 'ref' for o in inner[1]):
+            names |= _alternatives(grammar, option[1])
+    return names
+
+
+def _is_atom(src):
+    """True if a regex source is one char, escape, class or group (safe to quantify)."""
+    if len(src) == 1 or (len(src) == 2 and src[0] == '\\'):
+        return True
+    if src[0] not in '[(':
+        return False
+    depth = 0
+    i = 0
+    in_class = False
+    while i < len(src):
+        char = src[i]
+        if char == '\\':
+            i += 2
+            continue
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+            depth += src[0] == '['
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if src[0] == '[' and not in_class:
+            depth = 0
+        if depth == 0 and not in_class and i < len(src) - 1:
+            return False
+        i += 1
+    return True
+
+
+# --- Output ---
+
+def render_module(tables, grammar_path, grammar_text):
+    """Source of cq_tables.py."""
+    digest = hashlib.sha256(grammar_text.encode('utf-8')).hexdigest()
+    lines = [
+        f"# Generated by gen_parser.py from {os.path.basename(grammar_path)}; do not edit.",
+        "# Regenerate with: python gen_parser.py <grammar.ebnf>",
+        '',
+        f"GRAMMAR = {os.path.basename(grammar_path)!r}",
+        f"GRAMMAR_SHA256 = {digest!r}",
+        '',
+    ]
+    comments = {
+        'DISPATCH': "First char of a body token -> token kinds to try, in order",
+        'PARAM_DISPATCH': "First char of a semantic token parameter -> token kinds to try",
+        'PATTERNS': "Token kind -> regex (semantic_token matches NAME and '(')",
+        'LINE_START': "Chars that are a structure token / decorator prefix at line start, a fixed token elsewhere",
+    }
+    for name, table in tables.items():
+        lines.append(f"# {comments[name]}")
+        lines.append(f"{name} = {{")
+        for key, value in table.items():
+            lines.append(f"    {key!r}: {value!r},")
+        lines.append('}')
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def generate(grammar_path, fixed_tokens=None):
+    """Returns the cq_tables.py source for a grammar file."""
+    with open(grammar_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    grammar = Grammar(parse_ebnf(text), FIXED_TOKEN_MAP if fixed_tokens is None else fixed_tokens)
+    return render_module(build_tables(grammar), grammar_path, text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the table-driven CodeQuilt body parser from the EBNF grammar.")
+    parser.add_argument("grammar", nargs="?", default=DEFAULT_GRAMMAR, help="Path to codequilt-<version>.ebnf")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="Generated module (default: cq_tables.py next to this script)")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if the output file is not up to date")
+    args = parser.parse_args()
+
+    try:
+        source = generate(args.grammar)
+    except (OSError, GrammarError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.check:
+        current = open(args.output, 'r', encoding='utf-8').read() if os.path.exists(args.output) else None
+        if current != source:
+            print(f"{args.output} is out of date; rerun gen_parser.py", file=sys.stderr)
+            sys.exit(1)
+        print(f"{args.output} is up to date.")
+        return
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        f.write(source)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
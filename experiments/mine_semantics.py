@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+
+import argparse
+import ast
+import copy
+import json
+import os
+import re
+import sys
+
+from translation import KNOWN_SEMANTIC_TOKENS, SEMANTIC_TEMPLATES, semantic_template_arity
+
+# --- Semantic Pattern Miner ---
+# Walks a directory of Python, abstracts each statement into a parameterized shape
+# (names and literals become {0}, {1}, ...; try/with bodies become {body}) and
+# ranks the shapes that repeat by estimated CodeQuilt token savings. The top
+# shapes are emitted as SEMANTIC_TEMPLATES entries, which translation.py loads
+# with --templates (see load_semantic_templates()).
+
+MAX_PARAMS = 5
+MAX_TEMPLATE_LINES = 8
+BODY_STATEMENTS = (ast.Try, ast.With) # Shapes where the main body is the varying part
+
+# Each identifier, keyword, number or symbol is roughly one CQ body token
+RE_CQ_CHUNK = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+|\S")
+RE_PLACEHOLDER = re.compile(r"__cq_p(\d+)__")
+
+# Short name stems for generated semantic token names
+NODE_STEMS = {
+    'If': "IF", 'Try': "TRY", 'With': "WITH", 'For': "FOR", 'While': "WHILE", 'Return': "RET",
+    'Raise': "RAISE", 'Assign': "SET", 'AugAssign': "INC", 'Assert': "CHK", 'Delete': "DEL",
+    'Expr': "CALL", 'Call': "CALL", 'Compare': "CMP", 'Attribute': "", 'Name': "",
+}
+
+
+class _Abstracter(ast.NodeTransformer):
+    """Replaces names and literal constants with numbered placeholders."""
+
+    def __init__(self):
+        self.params = [] # Original source of each placeholder, in order
+        self._by_key = {}
+
+    def _placeholder(self, key, label):
+        if key not in self._by_key:
+            self._by_key[key] = len(self.params)
+            self.params.append(label)
+        return f"__cq_p{self._by_key[key]}__"
+
+    def visit_Name(self, node):
+        if node.id == "__cq_body__":
+            return node
+        return ast.Name(self._placeholder(('name', node.id), node.id), node.ctx)
+
+    def visit_Constant(self, node):
+        if node.value is None or isinstance(node.value, bool) or node.value is Ellipsis:
+            return node # Structural, like the t/f/n fixed tokens
+        return ast.Name(self._placeholder(('const', repr(node.value)), repr(node.value)), ast.Load())
+
+    def visit_JoinedStr(self, node):
+        # Literal parts of an f-string are not expressions; only abstract the holes
+        for value in node.values:
+            if isinstance(value, ast.FormattedValue):
+                value.value = self.visit(value.value)
+        return node
+
+    def visit_ExceptHandler(self, node):
+        self.generic_visit(node)
+        if node.name:
+            node.name = self._placeholder(('name', node.name), node.name)
+        return node
+
+
+def _shapes(stmt):
+    """Yields (template, params) shapes for one statement."""
+    if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Import, ast.ImportFrom)):
+        return # Definitions and imports are unique per file, not patterns
+    if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant):
+        return # Docstrings / bare literals
+    if isinstance(stmt, ast.Pass):
+        return
+
+    variants = [(copy.deepcopy(stmt), False)]
+    if isinstance(stmt, BODY_STATEMENTS):
+        abstract_body = copy.deepcopy(stmt)
+        abstract_body.body = [ast.Expr(ast.Name("__cq_body__", ast.Load()))]
+        variants.append((abstract_body, True))
+
+    for node, has_body in variants:
+        abstracter = _Abstracter()
+        node = abstracter.visit(node)
+        if not abstracter.params or len(abstracter.params) > MAX_PARAMS:
+            continue
+        source = ast.unparse(node)
+        if source.count('\n') + 1 > MAX_TEMPLATE_LINES:
+            continue
+        template = source.replace('{', '{{').replace('}', '}}')
+        template = RE_PLACEHOLDER.sub(r"{\1}", template)
+        if has_body:
+            template = template.replace("__cq_body__", "{body}")
+        yield template, abstracter.params
+
+
+def _iter_statements(tree):
+    """Yields every statement in a module, including nested blocks."""
+    for node in ast.walk(tree):
+        for field in ('body', 'orelse', 'finalbody'):
+            block = getattr(node, field, None)
+            if isinstance(block, list):
+                for stmt in block:
+                    if isinstance(stmt, ast.stmt):
+                        yield stmt
+
+
+def _cq_cost(template):
+    """Estimated CQ body tokens for the fixed (non-parameter) part of a template."""
+    fixed = re.sub(r"\{\d+\}|\{body\}", "", template).replace('{{', '{').replace('}}', '}')
+    chunks = len(RE_CQ_CHUNK.findall(fixed))
+    lines = template.split('\n')
+    structure = len(lines) - 1 # N per extra line
+    levels = [(len(line) - len(line.lstrip(' '))) // 4 for line in lines]
+    structure += sum(abs(b - a) for a, b in zip(levels, levels[1:])) # > / < tokens
+    return chunks + structure
+
+
+def _call_cost(arity, has_body):
+    """Estimated tokens for NAME(p0:p1:...{body}) excluding the parameters themselves."""
+    return 1 + 2 + max(arity - 1, 0) + (3 if has_body else 0) # name, ( ), ':' separators, :{ }
+
+
+def _token_name(template, taken):
+    """Derives an uppercase semantic token name from a template's leading nodes."""
+    try:
+        tree = ast.parse(template.replace('{body}', 'pass').format(*[f"p{i}" for i in range(MAX_PARAMS)]))
+        stems = []
+        for node in ast.walk(tree.body[0]):
+            stem = NODE_STEMS.get(type(node).__name__)
+            if stem and stem not in stems:
+                stems.append(stem)
+            if isinstance(node, ast.Attribute) and node.attr.isidentifier():
+                stems.append(node.attr.upper()[:6])
+            if len(stems) >= 3:
+                break
+        base = "".join(stems)[:16] or "PAT"
+    except (SyntaxError, IndexError, KeyError, ValueError):
+        base = "PAT"
+    base = re.sub(r"[^A-Z0-9_]", "", base) or "PAT"
+    if len(base) < 2:
+        base += "X"
+    name, n = base, 1
+    while name in taken:
+        n += 1
+        name = f"{base}{n}"
+    taken.add(name)
+    return name
+
+
+def mine_directory(root, min_uses=3, top=20):
+    """Mines `root` for repeated statement shapes; returns candidate definitions, best first."""
+    counts = {}
+    examples = {}
+    param_labels = {}
+    files = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.') and d != '__pycache__']
+        for filename in sorted(filenames):
+            if not filename.endswith('.py'):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    tree = ast.parse(f.read(), filename=path)
+            except (SyntaxError, UnicodeDecodeError, OSError) as e:
+                print(f"Warning: Skipping {path}: {e}", file=sys.stderr)
+                continue
+            files += 1
+            for stmt in _iter_statements(tree):
+                for template, params in _shapes(stmt):
+                    counts[template] = counts.get(template, 0) + 1
+                    if template not in examples:
+                        examples[template] = f"{path}:{stmt.lineno}"
+                        param_labels[template] = params
+
+    existing = set(SEMANTIC_TEMPLATES.values())
+    candidates = []
+    for template, uses in counts.items():
+        if uses < min_uses or template in existing:
+            continue
+        arity = semantic_template_arity(template)
+        has_body = '{body}' in template
+        per_use = _cq_cost(template) - _call_cost(arity, has_body)
+        if per_use <= 0:
+            continue
+        candidates.append({
+            'template': template,
+            'params': param_labels[template],
+            'uses': uses,
+            'tokens_saved_per_use': per_use,
+            # The definition has to be sent in the prompt once
+            'est_tokens_saved': per_use * uses - _cq_cost(template),
+            'example': examples[template],
+        })
+
+    candidates.sort(key=lambda c: (-c['est_tokens_saved'], c['template']))
+    taken = set(KNOWN_SEMANTIC_TOKENS)
+    result = []
+    for candidate in candidates:
+        if candidate['est_tokens_saved'] <= 0 or len(result) >= top:
+            break
+        candidate = {'name': _token_name(candidate['template'], taken), **candidate}
+        result.append(candidate)
+    print(f"Mined {files} file(s): {len(counts)} distinct shapes, {len(result)} candidate(s).", file=sys.stderr)
+    return result
+
+
+# --- Main Execution ---
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mine a Python code base for repeated statement patterns worth a CodeQuilt semantic token.",
+        epilog="Write candidates with --json and load them into the decoder with translation.py --templates."
+    )
+    parser.add_argument("root", help="Directory of Python files to mine")
+    parser.add_argument("--min-uses", type=int, default=3, help="Minimum occurrences for a pattern (default: 3)")
+    parser.add_argument("--top", type=int, default=20, help="Number of candidates to emit (default: 20)")
+    parser.add_argument("--json", help="Write candidate definitions to this JSON file")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        print(f"Error: Not a directory: {args.root}", file=sys.stderr)
+        sys.exit(1)
+
+    candidates = mine_directory(args.root, min_uses=args.min_uses, top=args.top)
+    for candidate in candidates:
+        params = ":".join(f"<{label}>" for label in candidate['params'])
+        body = ":{<body>}" if '{body}' in candidate['template'] else ""
+        print(f"{candidate['name']}({params}{body})  uses={candidate['uses']}"
+              f" saves~{candidate['est_tokens_saved']} tokens ({candidate['tokens_saved_per_use']}/use)  e.g. {candidate['example']}")
+        for line in candidate['template'].split('\n'):
+            print(f"    {line}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(candidates, f, indent=2)
+        print(f"Successfully saved {len(candidates)} candidate(s) to: {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+import argparse
+import ast
+import hashlib
+import sys
+
+from translation import (
+    DEFAULT_LITERAL_THRESHOLD, SPEC_VERSION, CodeQuiltDecodeError, CodeQuiltDecoder, DecodeContext, estimate_tokens,
+    load_semantic_templates,
+)
+
+# --- Prompt Payload Generator ---
+# Builds the LLM instruction block (spec rules, corpus C, fixed tokens, semantic
+# token definitions) from the decoder's own tables instead of a hand-edited copy
+# of Compressed-spec.md. The output depends only on the tables: entries are
+# sorted, whitespace is fixed and there are no timestamps, so every request that
+# starts with it shares a byte-identical prefix the provider can cache. Only the
+# semantic tokens the decoder actually expands are listed, and the literal
+# examples and escapes are the ones validate() accepts with the same tables.
+
+# Spec rules that are not tables; the {fields} are filled in from the context
+RULES = """\
+CodeQuilt {spec_version}: compressed Python 3.11. Reply with one quilt: [Header]|||Body
+Header: ;-separated Key:Value, keys case-sensitive, no extra spaces.
+V:{spec_version} required.
+D:[d0=id,d1=id,...] identifiers not in C; body refs d<n>.
+X:[l0=b64,...] base64 of UTF-8 literals longer than lth, multiline, or comments (O:[cmt=k]); body refs l<n>.
+I:[path,path as alias,...] optional imports info.
+O:[cmt=k,lth=N] options; lth default {literal_threshold}.
+Body: tokens; whitespace between tokens ignored.
+Refs: c<n> corpus C entry n, d<n> header D entry n, l<n> header X entry n.
+Literals: {literals}; single-line, at most lth chars; {escapes}.
+Multi-char operators are token sequences: == is = =, != is ! =, += is + =, ** is * *.
+Semantic: NAME(p0:p1:...) or NAME(p0:...:{{body}}); params separated by ':'.
+Escape hatch, last resort: L'{{raw python}}' with \\ as \\\\, {{ as \\{{, }} as \\}}."""
+
+# Inline literal examples shown to the model; each must pass validate()
+EXAMPLE_LITERALS = ("123", "-10", "3.14", "'abc'", "\"d'ef\"", "b'xy'")
+
+# Escapes that might be offered (as shown, sample): listed only where validate() accepts
+# them and Python treats them as escapes (b'\\u0041' is six bytes, not b'A')
+ESCAPE_CANDIDATES = (
+    ("\\\\", "\\\\"), ("\\'", "\\'"), ('\\"', '\\"'), ("\\n", "\\n"), ("\\t", "\\t"),
+    ("\\r", "\\r"), ("\\b", "\\b"), ("\\f", "\\f"), ("\\a", "\\a"), ("\\v", "\\v"),
+    ("\\0", "\\0"), ("\\xHH", "\\x41"), ("\\uXXXX", "\\u0041"),
+)
+
+# Expansions of the semantic tokens decoded in code (the rest are SEMANTIC_TEMPLATES);
+# {logger} is corpus c105 and {levels} the LOG level letters
+SEMANTIC_DOCS = {
+    "LOG": ("LOG(lvl:fmt:args...)", "{logger}.<level>(fmt, args...); lvl {levels}"),
+    "ATTR": ("ATTR(obj:attr:val)", "obj.attr = val"),
+    "RETN": ("RETN(var)", "if var is None:\\n    return None"),
+    "TRYLOG": ("TRYLOG(err:var:{{body}})",
+               "try:\\n    body\\nexcept err as var:\\n    {logger}.error(f\"FAIL: {{var}}\", exc_info=True)"),
+}
+
+# Display names of the line-start meanings of fixed tokens
+LINE_START_NAMES = {'_INDENT_': "indent", '_DEDENT_': "dedent", 'decorator_prefix': "decorator"}
+
+
+def _literal_ok(context, literal):
+    quilt = f"[V:{context.spec_version};D:[d0=x]]|||d0 = {literal} N"
+    return CodeQuiltDecoder(quilt, context).validate().ok
+
+
+def _literal_rules(context):
+    """Literal examples and accepted escapes, checked against validate() with these tables."""
+    rejected = [literal for literal in EXAMPLE_LITERALS if not _literal_ok(context, literal)]
+    if rejected:
+        raise CodeQuiltDecodeError(f"Payload literal examples rejected by the decoder: {' '.join(rejected)}")
+    escapes = {}
+    for prefix in ("", "b"):
+        escapes[prefix] = " ".join(
+            shown for shown, sample in ESCAPE_CANDIDATES
+            if ast.literal_eval(f"{prefix}'{sample}'") != ast.literal_eval(f"r{prefix}'{sample}'")
+            and _literal_ok(context, f"{prefix}'{sample}'"))
+    if escapes[""] == escapes["b"]:
+        escape_rule = f"escapes (str and bytes) {escapes['']}"
+    else:
+        escape_rule = f"str escapes {escapes['']}; bytes escapes {escapes['b'] or 'none'}"
+    return " ".join(EXAMPLE_LITERALS), escape_rule
+
+
+def _corpus_section(context):
+    entries = sorted(context.corpus.items(), key=lambda item: int(item[0][1:]))
+    return "Corpus C: " + " ".join(f"{ref}={value}" for ref, value in entries)
+
+
+def _fixed_section(context):
+    same, mapped = [], []
+    for key in sorted(context.fixed_tokens):
+        value = context.fixed_tokens[key]
+        if value == '\n':
+            continue # N, listed with the structure tokens
+        if value.strip() == key:
+            same.append(key)
+        else:
+            mapped.append(f"{key}={value.strip()}")
+    line_start = []
+    for key, kind in sorted(context.line_start_kinds.items()):
+        meaning = context.indent_tokens[key] if kind == 'structure' else kind
+        line_start.append(f"{key}={LINE_START_NAMES.get(meaning, meaning)}")
+    newline = "".join(key for key, value in sorted(context.fixed_tokens.items()) if value == '\n')
+    return "\n".join([
+        f"Fixed tokens: {newline}=newline. At line start: {' '.join(line_start)}.",
+        f"As in Python: {' '.join(same)}",
+        f"Mapped: {' '.join(mapped)}",
+    ])
+
+
+def _semantic_section(context):
+    logger = context.corpus.get('c105', "logger")
+    levels = " ".join(f"{letter}={name}" for letter, name in sorted(context.log_levels.items()))
+    lines = ["Semantic tokens:"]
+    for name in sorted(context.semantic_signatures):
+        if name in context.semantic_templates:
+            template = context.semantic_templates[name]
+            arity, _, has_body, _ = context.semantic_signatures[name]
+            params = [f"p{i}" for i in range(arity)]
+            usage = f"{name}({':'.join(params + (['{body}'] if has_body else []))})"
+            expansion = template.format(*params, body="body")
+        elif name in SEMANTIC_DOCS:
+            usage, expansion = (part.format(logger=logger, levels=levels) for part in SEMANTIC_DOCS[name])
+        else:
+            continue
+        lines.append(f"{usage} -> {expansion.replace(chr(10), chr(92) + 'n')}")
+    return "\n".join(lines)
+
+
+def build_payload(context=None, spec_version=None):
+    """Byte-stable instruction block for the tables of one spec version."""
+    context = context or DecodeContext()
+    if spec_version is not None and spec_version != context.spec_version:
+        raise CodeQuiltDecodeError(f"No tables for spec version '{spec_version}' (have '{context.spec_version}')")
+    literals, escapes = _literal_rules(context)
+    rules = RULES.format(spec_version=context.spec_version, literal_threshold=DEFAULT_LITERAL_THRESHOLD,
+                         literals=literals, escapes=escapes)
+    sections = [rules, _fixed_section(context), _corpus_section(context), _semantic_section(context)]
+    return "\n".join(sections) + "\n"
+
+
+def compose_prompt(task, payload=None):
+    """Payload first, per-request text after it, so the payload stays a cacheable prefix."""
+    return (payload or build_payload()) + "\n" + task
+
+
+def payload_report(payload):
+    """Size, estimated tokens and sha256 of a payload (the digest identifies the cache prefix)."""
+    data = payload.encode('utf-8')
+    return {'bytes': len(data), 'tokens': estimate_tokens(payload), 'sha256': hashlib.sha256(data).hexdigest()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the CodeQuilt LLM instruction payload from the decoder tables.")
+    parser.add_argument("--spec-version", default=SPEC_VERSION, help=f"Spec version to build for (default: {SPEC_VERSION})")
+    parser.add_argument("--templates", help="JSON file of semantic templates to include (see mine_semantics.py)")
+    parser.add_argument("-o", "--output", help="Write the payload to this file instead of stdout")
+    parser.add_argument("--check", metavar="SHA256", help="Exit 1 if the payload digest differs (prefix changed)")
+    args = parser.parse_args()
+
+    try:
+        if args.templates:
+            load_semantic_templates(args.templates)
+        payload = build_payload(spec_version=args.spec_version)
+    except (CodeQuiltDecodeError, OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(payload)
+    else:
+        sys.stdout.write(payload)
+    report = payload_report(payload)
+    print(f"Payload: {report['bytes']} bytes, ~{report['tokens']} tokens, sha256 {report['sha256']}", file=sys.stderr)
+    if args.check and args.check != report['sha256']:
+        print(f"Error: payload digest changed (expected {args.check})", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
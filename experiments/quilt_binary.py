@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+import zlib
+
+from translation import MAX_NESTING_DEPTH, CodeQuiltDecodeError, CodeQuiltDecoder, default_context
+
+# --- Binary Quilt Format (.cqb) ---
+# A parsed quilt stored so it can be decoded again without lexing:
+#
+#   magic "\x89CQB", format version byte
+#   header block   varint length + the text header "[V:...;D:[...];X:[...]]"
+#   fixed table    crc32 (4 bytes, little-endian) of the fixed-token alphabet
+#   literal table  varint count, then per entry: type byte, varint length, UTF-8
+#   tokens         varints up to the end of the data
+#
+# A token is one varint `operand << 3 | kind`. Fixed tokens are indices into the
+# sorted fixed-token alphabet, refs are their number, and literals (strings,
+# bytes, numbers, escape hatch code, semantic names) are indices into the
+# literal table, where each distinct value is stored once. A semantic token is
+# followed by its parameter count and parameters, then 0 (no block) or the
+# block's token count + 1 and its tokens. Whitespace is not kept, and token
+# positions in warnings and errors are token indices.
+
+MAGIC = b"\x89CQB"
+FORMAT_VERSION = 1
+BINARY_EXTENSION = ".cqb"
+
+# Token kinds (low 3 bits of a token code)
+KIND_FIXED, KIND_CORPUS, KIND_DYNAMIC, KIND_LITERAL_REF, KIND_LITERAL, KIND_CONSTANT, KIND_SEMANTIC, KIND_LOG_LEVEL = range(8)
+
+REF_KINDS = {'corpus_ref': KIND_CORPUS, 'dynamic_ref': KIND_DYNAMIC, 'literal_ref': KIND_LITERAL_REF}
+REF_TYPES = {kind: (token_type, token_type[0]) for token_type, kind in REF_KINDS.items()}
+
+# Literal table entry types: token type -> type byte (non-canonical refs such as d07 are stored as text)
+LITERAL_TYPES = {'string_literal': b's', 'bytes_literal': b'b', 'number_literal': b'n', 'escape_hatch': b'h',
+                 'semantic_name': b'N', 'corpus_ref': b'c', 'dynamic_ref': b'd', 'literal_ref': b'l'}
+LITERAL_TOKEN_TYPES = {type_byte[0]: token_type for token_type, type_byte in LITERAL_TYPES.items()}
+
+CONSTANTS = [('boolean_literal', 'f'), ('boolean_literal', 't'), ('null_literal', 'n')]
+
+# Escapes that make an inline string value lex back to itself
+STRING_ESCAPES = {'\\': '\\\\', '\n': '\\n', '\t': '\\t', '\r': '\\r', '\b': '\\b', '\f': '\\f'}
+
+
+def is_binary_quilt(data):
+    """True if `data` starts like a binary quilt."""
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:len(MAGIC)]) == MAGIC
+
+
+def _fixed_alphabet(context):
+    alphabet = ''.join(sorted(context.fixed_tokens))
+    return alphabet, zlib.crc32(alphabet.encode('utf-8'))
+
+
+# --- Text -> Binary ---
+
+class _Writer:
+    def __init__(self, context):
+        self.context = context
+        self.alphabet = {char: i for i, char in enumerate(_fixed_alphabet(context)[0])}
+        self.literals = {} # (type byte, text) -> table index
+        self.tokens = bytearray()
+
+    def varint(self, value, out=None):
+        out = self.tokens if out is None else out
+        while value >= 0x80:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+
+    def literal(self, token_type, text):
+        key = (LITERAL_TYPES[token_type], text)
+        index = self.literals.get(key)
+        if index is None:
+            index = self.literals[key] = len(self.literals)
+        return index
+
+    def token(self, token):
+        token_type, value = token['type'], token['value']
+        if token_type == 'fixed_token':
+            self.varint(self.alphabet[value] << 3 | KIND_FIXED)
+        elif token_type in REF_KINDS:
+            digits = value[1:]
+            if str(int(digits)) == digits:
+                self.varint(int(digits) << 3 | REF_KINDS[token_type])
+            else:
+                self.varint(self.literal(token_type, value) << 3 | KIND_LITERAL)
+        elif token_type == 'escape_hatch':
+            self.varint(self.literal(token_type, token['raw_code']) << 3 | KIND_LITERAL)
+        elif token_type in LITERAL_TYPES:
+            self.varint(self.literal(token_type, value) << 3 | KIND_LITERAL)
+        elif token_type in ('boolean_literal', 'null_literal'):
+            self.varint(CONSTANTS.index((token_type, value)) << 3 | KIND_CONSTANT)
+        elif token_type == 'log_level':
+            self.varint(ord(value) << 3 | KIND_LOG_LEVEL)
+        elif token_type == 'semantic_token':
+            self.varint(self.literal('semantic_name', value) << 3 | KIND_SEMANTIC)
+            self.varint(len(token['params']))
+            for param in token['params']:
+                self.token(param)
+            body = token['body']
+            self.varint(0 if body is None else len(body) + 1)
+            for body_token in body or ():
+                self.token(body_token)
+        else:
+            raise CodeQuiltDecodeError(f"Token type {token_type} cannot be stored in a binary quilt")
+
+    def getvalue(self, header_str):
+        out = bytearray(MAGIC)
+        out.append(FORMAT_VERSION)
+        header = header_str.encode('utf-8')
+        self.varint(len(header), out)
+        out += header
+        out += _fixed_alphabet(self.context)[1].to_bytes(4, 'little')
+        self.varint(len(self.literals), out)
+        for (type_byte, text) in self.literals: # Insertion order is index order
+            encoded = text.encode('utf-8')
+            out += type_byte
+            self.varint(len(encoded), out)
+            out += encoded
+        return bytes(out + self.tokens)
+
+
+def codequilt_to_binary(codequilt_string, context=None):
+    """Lexes a text quilt once and returns its binary form."""
+    decoder = CodeQuiltDecoder(codequilt_string, context)
+    decoder._start() # Parses (and checks) the header
+    writer = _Writer(decoder.context)
+    while True:
+        token = decoder._parse_next_token()
+        if token is None:
+            break
+        writer.token(token)
+    header_str = codequilt_string.split('|||', 1)[0]
+    return writer.getvalue(header_str)
+
+
+# --- Binary -> Tokens / Text ---
+
+class _Reader:
+    def __init__(self, data, context):
+        self.data = bytes(data)
+        self.pos = 0
+        self.context = context
+        self.index = 0 # Token counter, used as 'pos'
+        self.depth = 0
+
+    def varint(self):
+        data, pos = self.data, self.pos
+        value = shift = 0
+        while True:
+            if pos >= len(data):
+                raise CodeQuiltDecodeError("Truncated binary quilt")
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                self.pos = pos
+                return value
+            shift += 7
+
+    def chunk(self, length):
+        end = self.pos + length
+        if end > len(self.data):
+            raise CodeQuiltDecodeError("Truncated binary quilt")
+        chunk = self.data[self.pos:end]
+        self.pos = end
+        return chunk
+
+    def preamble(self):
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise CodeQuiltDecodeError("Not a binary quilt (bad magic)")
+        self.pos = len(MAGIC)
+        version = self.chunk(1)[0]
+        if version != FORMAT_VERSION:
+            raise CodeQuiltDecodeError(f"Unsupported binary quilt format {version}")
+        try:
+            header_str = self.chunk(self.varint()).decode('utf-8')
+            alphabet, crc = _fixed_alphabet(self.context)
+            if int.from_bytes(self.chunk(4), 'little') != crc:
+                raise CodeQuiltDecodeError("Binary quilt was written with a different fixed-token table")
+            self.alphabet = alphabet
+            self.literals = []
+            for _ in range(self.varint()):
+                type_byte = self.chunk(1)[0]
+                if type_byte not in LITERAL_TOKEN_TYPES:
+                    raise CodeQuiltDecodeError(f"Unknown literal type {type_byte!r} in binary quilt")
+                self.literals.append((LITERAL_TOKEN_TYPES[type_byte], self.chunk(self.varint()).decode('utf-8')))
+        except UnicodeDecodeError as e:
+            raise CodeQuiltDecodeError(f"Invalid UTF-8 in binary quilt: {e}")
+        return header_str
+
+    def token(self):
+        code = self.varint()
+        kind, operand = code & 7, code >> 3
+        pos = self.index
+        self.index += 1
+        if kind == KIND_FIXED:
+            if operand >= len(self.alphabet):
+                raise CodeQuiltDecodeError(f"Invalid fixed token code {operand} in binary quilt")
+            return {'type': 'fixed_token', 'value': self.alphabet[operand], 'pos': pos}
+        if kind in REF_TYPES:
+            token_type, prefix = REF_TYPES[kind]
+            return {'type': token_type, 'value': f"{prefix}{operand}", 'pos': pos}
+        if kind == KIND_CONSTANT:
+            if operand >= len(CONSTANTS):
+                raise CodeQuiltDecodeError(f"Invalid constant code {operand} in binary quilt")
+            token_type, value = CONSTANTS[operand]
+            return {'type': token_type, 'value': value, 'pos': pos}
+        if kind == KIND_LOG_LEVEL:
+            if operand > 0x10FFFF:
+                raise CodeQuiltDecodeError(f"Invalid log level code {operand} in binary quilt")
+            return {'type': 'log_level', 'value': chr(operand), 'pos': pos}
+        if operand >= len(self.literals):
+            raise CodeQuiltDecodeError(f"Invalid literal index {operand} in binary quilt")
+        token_type, text = self.literals[operand]
+        if kind == KIND_LITERAL:
+            if token_type == 'escape_hatch':
+                return {'type': token_type, 'value': _spell_hatch(text), 'raw_code': text, 'pos': pos}
+            if token_type == 'semantic_name':
+                raise CodeQuiltDecodeError(f"Semantic name used as a literal in binary quilt")
+            return {'type': token_type, 'value': text, 'pos': pos}
+        if kind != KIND_SEMANTIC or token_type != 'semantic_name':
+            raise CodeQuiltDecodeError(f"Invalid token code {code} in binary quilt")
+        if self.depth >= MAX_NESTING_DEPTH:
+            raise CodeQuiltDecodeError(f"Semantic token {text} nested deeper than {MAX_NESTING_DEPTH} levels")
+        self.depth += 1
+        params = [self.token() for _ in range(self.varint())]
+        body_count = self.varint()
+        body = [self.token() for _ in range(body_count - 1)] if body_count else None
+        self.depth -= 1
+        return {'type': 'semantic_token', 'value': text, 'params': params, 'body': body, 'pos': pos}
+
+    def tokens(self):
+        data, alphabet = self.data, self.alphabet
+        while self.pos < len(data):
+            byte = data[self.pos]
+            if byte < 0x80 and byte & 7 == KIND_FIXED and byte >> 3 < len(alphabet):
+                self.pos += 1 # One-byte fixed token, the most common case
+                self.index += 1
+                yield {'type': 'fixed_token', 'value': alphabet[byte >> 3], 'pos': self.index - 1}
+            else:
+                yield self.token()
+
+
+def read_binary_quilt(data, context=None):
+    """Returns (header string, iterator of token structures) for a binary quilt."""
+    reader = _Reader(data, context or default_context())
+    header_str = reader.preamble()
+    return header_str, reader.tokens()
+
+
+def _spell_hatch(raw_code):
+    return "L'{" + raw_code.replace('\\', '\\\\').replace('{', '\\{').replace('}', '\\}') + "}'"
+
+
+def _spell(token):
+    """Body text of one token; lexes back to the same token."""
+    token_type, value = token['type'], token['value']
+    if token_type == 'string_literal':
+        quote = value[0]
+        content = ''.join(STRING_ESCAPES.get(char, char) for char in value[1:-1]).replace(quote, '\\' + quote)
+        return quote + content + quote
+    if token_type == 'semantic_token':
+        parts = [_spell(param) for param in token['params']]
+        if token['body'] is not None:
+            parts.append('{' + ' '.join(_spell(body_token) for body_token in token['body']) + '}')
+        return f"{value}({':'.join(parts)})"
+    return value
+
+
+def binary_to_codequilt(data, context=None):
+    """Text quilt equivalent to a binary one (same tokens; whitespace is one space)."""
+    header_str, tokens = read_binary_quilt(data, context)
+    return header_str + "|||" + " ".join(_spell(token) for token in tokens)
+
+
+# --- Main Execution ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert CodeQuilt text quilts (.cq) to the binary form (.cqb) and back.")
+    parser.add_argument("input_file", help=f"A .cq file (converted to {BINARY_EXTENSION}) or a {BINARY_EXTENSION} file (converted to .cq)")
+    parser.add_argument("-o", "--output", help="Output path (default: input name with the other extension)")
+    args = parser.parse_args()
+
+    base, ext = os.path.splitext(args.input_file)
+    to_text = ext.lower() == BINARY_EXTENSION
+    output_path = args.output or base + (".cq" if to_text else BINARY_EXTENSION)
+    try:
+        if to_text:
+            with open(args.input_file, 'rb') as f:
+                data = f.read()
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(binary_to_codequilt(data))
+        else:
+            with open(args.input_file, 'r', encoding='utf-8') as f:
+                text = f.read()
+            data = codequilt_to_binary(text)
+            with open(output_path, 'wb') as f:
+                f.write(data)
+            print(f"{len(text.encode('utf-8'))} bytes -> {len(data)} bytes")
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except CodeQuiltDecodeError as e:
+        print(f"Error converting {args.input_file}: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Saved: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
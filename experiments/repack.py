@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+
+import argparse
+import base64
+import contextlib
+import os
+import sys
+from io import StringIO
+
+from translation import (
+    CORPUS_DICT, SPEC_VERSION, CodeQuiltDecodeError, CodeQuiltDecoder, estimate_tokens,
+)
+
+# --- CodeQuilt Repacker ---
+# Re-optimizes an existing quilt for size without changing what it decodes to:
+#   * d<n> entries whose name is in CORPUS_DICT become c<n> refs
+#   * D: and X: are renumbered so the most frequent entries get the shortest ids
+#   * identical X: literals are merged, unused D:/X: entries dropped
+#   * each distinct literal goes inline or to X:, whichever costs less over all of
+#     its uses (bytes and estimated tokens); inline strings over `lth` move to X:
+#   * inter-token whitespace is reduced to what the lexer actually needs
+# The input is returned unchanged if the rewrite would not be smaller.
+
+# Reverse corpus lookup (name -> c<n>), first key wins on duplicates
+CORPUS_REVERSE = {}
+for _key, _name in CORPUS_DICT.items():
+    CORPUS_REVERSE.setdefault(_name, _key)
+
+
+class _SpanLexer(CodeQuiltDecoder):
+    """Decoder used only for lexing; records where each token ends in the body."""
+
+    def _parse_next_token(self, in_semantic_param=False, in_semantic_body=False):
+        token = super()._parse_next_token(in_semantic_param=in_semantic_param, in_semantic_body=in_semantic_body)
+        if token is not None:
+            token['end'] = self.pos
+        return token
+
+
+def _lex_body(body, literal_threshold=sys.maxsize):
+    """Lexes a body string into span-annotated token structures."""
+    lexer = _SpanLexer("")
+    lexer.body = body
+    lexer.literal_threshold = literal_threshold # Repacking reports no threshold warnings
+    tokens = []
+    while True:
+        token = lexer._parse_next_token()
+        if token is None:
+            return tokens
+        tokens.append(token)
+
+
+def _inline_spelling(value):
+    """Returns the inline body spelling that decodes exactly like an X: literal, or None."""
+    # A literal ref decodes to repr(value); an inline string decodes to its
+    # quoted content verbatim, so they only agree when repr needs no escapes.
+    spelled = repr(value)
+    if spelled[1:-1] == value:
+        return spelled
+    return None
+
+
+def _encode_literal(value):
+    """Base64-encodes an X: literal; padding is dropped (the decoder restores it)."""
+    return base64.b64encode(value.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_quietly(codequilt_string):
+    """Decodes without formatting or stderr noise; used to prove equivalence."""
+    with contextlib.redirect_stderr(StringIO()):
+        return CodeQuiltDecoder(codequilt_string).decode(format_code=False)
+
+
+def _needs_space(left, right):
+    """True if `left` and `right` would not lex back as two tokens when glued together."""
+    # Known multi-token hazards: '1 . 5' -> 1.5, 'R E T N (' -> RETN(
+    if left == '.' and right[:1].isdigit():
+        return True
+    if len(left) == 1 and left.isupper() and right == '(':
+        return True
+    try:
+        tokens = _lex_body(left + right)
+    except CodeQuiltDecodeError:
+        return True
+    return len(tokens) != 2 or tokens[0]['end'] != len(left)
+
+
+class _Repacker:
+    """Holds the per-quilt state while a quilt is rewritten."""
+
+    def __init__(self, codequilt_string):
+        if '|||' not in codequilt_string:
+            raise CodeQuiltDecodeError("Invalid CodeQuilt format: Missing '|||' separator.")
+        self.codequilt_string = codequilt_string
+        self.header_part, self.body = codequilt_string.split('|||', 1)
+
+        header_reader = CodeQuiltDecoder(codequilt_string)
+        header_reader._parse_header(self.header_part)
+        self.dynamic_map = header_reader.dynamic_map
+        self.literal_map = header_reader.literal_map
+        self.literal_threshold = header_reader.literal_threshold
+        self.keep_comments = header_reader.keep_comments
+
+        self.tokens = _lex_body(self.body)
+        self.dynamic_ids = {} # name -> new d<n>
+        self.literal_ids = {} # value -> new l<n>
+        self.literal_placement = {} # value -> 'inline' or 'x'
+        self.stats = {'corpus_remapped': 0, 'literals_inlined': 0, 'literals_moved_to_x': 0}
+
+    # --- Analysis ---
+
+    def _iter_tokens(self, tokens):
+        """Yields every token, descending into semantic parameters and bodies."""
+        for token in tokens:
+            yield token
+            if token['type'] == 'semantic_token':
+                yield from self._iter_tokens(token['params'])
+                if token['body']:
+                    yield from self._iter_tokens(token['body'])
+
+    def _is_comment(self, value):
+        return self.keep_comments and value.strip().startswith('#')
+
+    def _literal_value(self, token):
+        """(value, inline spelling or None if it must stay in X:) for movable literals, else None."""
+        if token['type'] == 'literal_ref':
+            value = self.literal_map[token['value']]
+            if self._is_comment(value) or len(value) > self.literal_threshold:
+                return value, None
+            return value, _inline_spelling(value)
+        if token['type'] == 'string_literal':
+            content = token['value'][1:-1]
+            if self._is_comment(content) or _inline_spelling(content) != token['value']:
+                return None # Only strings spelled like repr() decode the same from X:
+            return content, (token['value'] if len(content) <= self.literal_threshold else None)
+        return None
+
+    def _place_literals(self, uses):
+        """Puts each distinct literal inline or in X:, given {value: (spelling, use count)}."""
+        ref = f"l{len(uses)}" # At least as long as any new l<n>
+        for value, (spelling, count) in uses.items():
+            if spelling is None:
+                self.literal_placement[value] = 'x'
+                continue
+            entry = f"{ref}={_encode_literal(value)},"
+            inline_cost = (count * len(spelling), count * estimate_tokens(spelling))
+            x_cost = (len(entry) + count * len(ref), estimate_tokens(entry) + count * estimate_tokens(ref))
+            # Inline unless X: is cheaper in both bytes and tokens
+            cheaper_in_x = x_cost[0] < inline_cost[0] and x_cost[1] < inline_cost[1]
+            self.literal_placement[value] = 'x' if cheaper_in_x else 'inline'
+
+    def _literal_plan(self, token):
+        """Returns ('inline', spelling) or ('x', value) for movable literal tokens, else None."""
+        found = self._literal_value(token)
+        if found is None:
+            return None
+        value, spelling = found
+        if self.literal_placement[value] == 'x':
+            return 'x', value
+        return 'inline', spelling
+
+    def _assign_ids(self):
+        """Numbers surviving D:/X: entries by descending frequency (first use breaks ties)."""
+        dynamic_counts = {}
+        literal_counts = {}
+        literal_uses = {}
+        for token in self._iter_tokens(self.tokens):
+            if token['type'] == 'dynamic_ref':
+                if token['value'] not in self.dynamic_map:
+                    raise CodeQuiltDecodeError(f"Cannot repack: unresolved dynamic reference {token['value']}")
+                name = self.dynamic_map[token['value']]
+                if name in CORPUS_REVERSE:
+                    self.stats['corpus_remapped'] += 1
+                else:
+                    dynamic_counts[name] = dynamic_counts.get(name, 0) + 1
+            elif token['type'] == 'literal_ref' and token['value'] not in self.literal_map:
+                raise CodeQuiltDecodeError(f"Cannot repack: unresolved literal reference {token['value']}")
+            found = self._literal_value(token)
+            if found is not None:
+                value, spelling = found
+                if value in literal_uses: # One use that must stay in X: keeps them all there
+                    previous, count = literal_uses[value]
+                    literal_uses[value] = (previous and spelling, count + 1)
+                else:
+                    literal_uses[value] = (spelling, 1)
+        self._place_literals(literal_uses)
+
+        for token in self._iter_tokens(self.tokens):
+            plan = self._literal_plan(token)
+            if plan is None:
+                continue
+            kind, value = plan
+            if kind == 'x':
+                literal_counts[value] = literal_counts.get(value, 0) + 1
+                if token['type'] == 'string_literal':
+                    self.stats['literals_moved_to_x'] += 1
+            elif token['type'] == 'literal_ref':
+                self.stats['literals_inlined'] += 1
+
+        by_frequency = lambda counts: sorted(counts, key=lambda k: -counts[k]) # Stable: ties keep first use
+        self.dynamic_ids = {name: f"d{i}" for i, name in enumerate(by_frequency(dynamic_counts))}
+        self.literal_ids = {value: f"l{i}" for i, value in enumerate(by_frequency(literal_counts))}
+        self.stats['literals_deduped'] = len(self.literal_map) - len(set(self.literal_map.values()))
+
+    # --- Rendering ---
+
+    def _spell(self, token, compact):
+        """Returns the body spelling of one token under the new numbering."""
+        token_type = token['type']
+        if token_type == 'dynamic_ref':
+            name = self.dynamic_map[token['value']]
+            return CORPUS_REVERSE.get(name) or self.dynamic_ids[name]
+        if token_type == 'semantic_token':
+            parts = [self._join(token['params'], compact, separator=':')]
+            if token['body'] is not None:
+                parts.append('{' + self._join(token['body'], compact) + '}')
+            return f"{token['value']}(" + ':'.join(parts) + ')'
+        if token_type == 'log_level':
+            return token['value']
+        plan = self._literal_plan(token)
+        if plan is not None:
+            kind, value = plan
+            return value if kind == 'inline' else self.literal_ids[value]
+        return self.body[token['pos']:token['end']]
+
+    def _join(self, tokens, compact, separator=None):
+        """Joins spelled tokens; `separator` is a fixed delimiter (semantic params)."""
+        spelled = [self._spell(token, compact) for token in tokens]
+        if separator is not None:
+            return separator.join(spelled)
+        if not compact:
+            # Keep the original inter-token gaps; only token spellings change
+            out = StringIO()
+            for i, (token, text) in enumerate(zip(tokens, spelled)):
+                if i:
+                    out.write(self.body[tokens[i - 1]['end']:token['pos']])
+                out.write(text)
+            return out.getvalue()
+        out = StringIO()
+        for i, text in enumerate(spelled):
+            if i and _needs_space(spelled[i - 1], text):
+                out.write(' ')
+            out.write(text)
+        return out.getvalue()
+
+    def _render_header(self):
+        """Rebuilds the header in its original field order with new D:/X: tables."""
+        d_field = ','.join(f"{new_id}={name}" for name, new_id in self.dynamic_ids.items())
+        x_field = ','.join(f"{new_id}={_encode_literal(value)}" for value, new_id in self.literal_ids.items())
+        fields = []
+        seen_x = False
+        for field in self.header_part.strip()[1:-1].split(';'):
+            if not field:
+                continue
+            key = field.split(':', 1)[0].strip()
+            if key == 'D':
+                if d_field:
+                    fields.append(f"D:[{d_field}]")
+            elif key == 'X':
+                seen_x = True
+                if x_field:
+                    fields.append(f"X:[{x_field}]")
+            else:
+                fields.append(field.strip())
+        if x_field and not seen_x:
+            fields.append(f"X:[{x_field}]")
+        return '[' + ';'.join(fields) + ']'
+
+    def repack(self):
+        """Returns the smallest verified-equivalent rewrite of the quilt, or the quilt itself."""
+        expected = _decode_quietly(self.codequilt_string)
+        self._assign_ids()
+        header = self._render_header()
+        for compact in (True, False):
+            candidate = header + '|||' + self._join(self.tokens, compact)
+            if _decode_quietly(candidate) == expected:
+                break
+        else:
+            raise CodeQuiltDecodeError("Repacked quilt does not decode to the original output; refusing to rewrite.")
+        sizes = lambda quilt: (len(quilt.encode('utf-8')), estimate_tokens(quilt))
+        new_size, old_size = sizes(candidate), sizes(self.codequilt_string)
+        if new_size == old_size or any(new > old for new, old in zip(new_size, old_size)):
+            return self.codequilt_string # Not smaller in bytes or tokens without growing the other
+        return candidate
+
+
+def repack_codequilt(codequilt_string):
+    """
+    Rewrites a CodeQuilt string into an equivalent, smaller one.
+
+    Returns (repacked_string, report). The repacked quilt is checked to decode
+    to exactly the same (unformatted) Python as the input before it is returned;
+    if it would not be smaller, the input is returned (report['unchanged']).
+    """
+    repacker = _Repacker(codequilt_string)
+    repacked = repacker.repack()
+    report = dict(repacker.stats)
+    report['unchanged'] = repacked is codequilt_string
+    report['original_bytes'] = len(codequilt_string.encode('utf-8'))
+    report['repacked_bytes'] = len(repacked.encode('utf-8'))
+    report['bytes_saved'] = report['original_bytes'] - report['repacked_bytes']
+    report['original_tokens'] = estimate_tokens(codequilt_string)
+    report['repacked_tokens'] = estimate_tokens(repacked)
+    report['tokens_saved'] = report['original_tokens'] - report['repacked_tokens']
+    return repacked, report
+
+
+# --- Main Execution ---
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-optimize an existing CodeQuilt (.cq) file for size.",
+        epilog=f"Based on CodeQuilt Spec {SPEC_VERSION}. Output decodes to the same Python as the input."
+    )
+    parser.add_argument("input_file", help="Path to the input CodeQuilt file (.cq)")
+    parser.add_argument("-o", "--output", help="Path for the repacked .cq file. If omitted, written to stdout.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input_file):
+        print(f"Error: Input file not found: {args.input_file}", file=sys.stderr)
+        sys.exit(1)
+
+    with open(args.input_file, 'r', encoding='utf-8') as f:
+        input_content = f.read().strip()
+
+    try:
+        repacked, report = repack_codequilt(input_content)
+    except CodeQuiltDecodeError as e:
+        print(f"Error repacking {args.input_file}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(repacked)
+        print(f"Successfully saved repacked quilt to: {args.output}", file=sys.stderr)
+    else:
+        print(repacked)
+
+    if report['unchanged']:
+        print("Repacking would not make this quilt smaller; written unchanged.", file=sys.stderr)
+    print(f"Bytes: {report['original_bytes']} -> {report['repacked_bytes']} (saved {report['bytes_saved']})", file=sys.stderr)
+    print(f"Estimated tokens: {report['original_tokens']} -> {report['repacked_tokens']} (saved {report['tokens_saved']})", file=sys.stderr)
+    print(f"Corpus remaps: {report['corpus_remapped']}, literals inlined: {report['literals_inlined']}, "
+          f"moved to X: {report['literals_moved_to_x']}, duplicate X entries merged: {report['literals_deduped']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
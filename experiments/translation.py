@@ -4,11 +4,19 @@ import argparse
 import base64
 import os
 import re
+import string
 import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from io import StringIO
+from types import MappingProxyType
 import json # Using json for easier parsing of bracketed lists/dicts initially
 
+try:
+    import cq_tables # Parser tables generated from codequilt-0.7.1.ebnf by gen_parser.py
+except ImportError:
+    cq_tables = None
+
 # --- CodeQuilt v0.7.1-semantic-py3.11-std25-v1 Constants ---
 
 SPEC_VERSION = "0.7.1-semantic-py3.11-std25-v1"
@@ -117,41 +125,207 @@ FIXED_TOKEN_MAP = {
     't': 'True', 'f': 'False', 'n': 'None',
 }
 
+# '>' and '<' are listed twice above, so the map resolves them to the comparison
+# operators. At the start of a line (N> / N<) they are indentation instead.
+INDENT_TOKENS = {'>': '_INDENT_', '<': '_DEDENT_'}
+
+# Fixed tokens that mean something else at the start of a line: '>'/'<' are
+# structure tokens (indentation) and '@' is the decorator prefix, not ' in '
+LINE_START_KINDS = dict(cq_tables.LINE_START) if cq_tables else {'<': 'structure', '>': 'structure', '@': 'decorator_prefix'}
+
+# LOG(<lvl>:...) level letters; only valid as LOG's first parameter
+LOG_LEVELS = {'i': 'info', 'd': 'debug', 'e': 'error', 'w': 'warning', 'c': 'critical'}
+
+# Semantic token names recognized in the body (spec section 7)
+KNOWN_SEMANTIC_TOKENS = {"LOG", "TRYLOG", "RETN", "RETF", "RAISE", "ATTR", "DGET", "DBEXEC", "DBFETCH1", "CHKEXIT", "CHKINIT", "PATHJOIN", "MKDIRS"}
+
+# Parameter counts of the semantic tokens expanded in code:
+# NAME -> (min params, max params or None, needs a {body} block, expansion ends its line)
+SEMANTIC_SIGNATURES = {
+    "LOG": (2, None, False, False),
+    "ATTR": (3, 3, False, False),
+    "RETN": (1, 1, False, True),
+    "TRYLOG": (2, 2, True, True),
+}
+
+# Table-driven semantic expansions: NAME -> Python template. `{0}`, `{1}`, ... are
+# the resolved parameters (the count fixes the arity), a line holding only `{body}`
+# is replaced by the token's body block, and 4-space steps are indent levels.
+# Literal braces are doubled, as in str.format. LOG/ATTR/RETN/TRYLOG are expanded
+# in code; mine_semantics.py emits new entries in this format.
+SEMANTIC_TEMPLATES = {
+    "RETF": "if not {0}:\n    return None",
+    "DGET": "{0} = {1}.get({2}, {3})",
+    "MKDIRS": "os.makedirs({0}, exist_ok=True)",
+}
+
 # Pre-compiled regex for efficiency
 # Basic C/D/L references
 RE_REF = re.compile(r"([cdl])(\d+)")
 # Semantic tokens (simple name capture)
-RE_SEMANTIC_START = re.compile(r"([A-Z][A-Z0-9_]+)\(")
+RE_SEMANTIC_START = re.compile(r"([A-Z][A-Z0-9_]{1,31})\(") # Bounded so long uppercase runs stay linear
 # Numbers (int/float)
 RE_NUMBER = re.compile(r"[+-]?\d+(\.\d+)?")
 # Identifiers (for basic validation where needed)
 RE_IDENTIFIER = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*")
-# Escape hatch L'{...}'
+# Escape hatch L'{...}' (the lexer finds the terminator with a cached str.find, see _hatch_terminator)
 RE_ESCAPE_HATCH = re.compile(r"L'{(.*?)}'", re.DOTALL) # Non-greedy match
+# Chunks used by estimate_tokens()
+RE_TOKEN_ESTIMATE = re.compile(r"[A-Za-z]+|\d+|\S")
+# Whitespace between body tokens and the \\, \{, \} escapes of a hatch (table parser)
+RE_WHITESPACE = re.compile(r"\s*")
+RE_HATCH_ESCAPE = re.compile(r"\\([{}\\])")
+
+# Body parsers: 'table' walks the tables gen_parser.py builds from the EBNF
+# grammar (cq_tables.py); 'hand' is the original hand-written lexer
+PARSERS = ('table', 'hand')
+DEFAULT_PARSER = 'table' if cq_tables else 'hand'
+
+# Limits for untrusted (LLM) input; both match what CPython itself accepts
+MAX_NESTING_DEPTH = 100 # Semantic tokens inside semantic parameters/bodies
+MAX_INDENT_LEVEL = 100 # CPython's "too many levels of indentation"
 
 class CodeQuiltDecodeError(ValueError):
     """Custom exception for decoding errors."""
     pass
 
-class CodeQuiltDecoder:
-    """Decodes a CodeQuilt v0.7.1 string into Python code."""
+class CodeQuiltTruncatedError(CodeQuiltDecodeError):
+    """The body ends inside a token; decode_partial() treats this as the resume point."""
+    pass
 
-    def __init__(self, codequilt_string):
-        self.codequilt_string = codequilt_string
-        self.header = {}
-        self.body = ""
-        self.dynamic_map = {}
-        self.literal_map = {}
-        self.options = {}
-        self.literal_threshold = DEFAULT_LITERAL_THRESHOLD
-        self.keep_comments = False
-        self.indent_level = 0
-        self.indent_spaces = "    " # Standard Python indent
-        self.output = StringIO()
-        self.needs_indent = False
-        self.pos = 0 # Current position in the body string
+def semantic_template_arity(template):
+    """Number of positional parameters a semantic template takes."""
+    indices = [int(field) for _, field, _, _ in string.Formatter().parse(template)
+               if field is not None and field.isdigit()]
+    return max(indices) + 1 if indices else 0
+
+def template_signature(template):
+    """SEMANTIC_SIGNATURES-style tuple for a semantic template."""
+    arity = semantic_template_arity(template)
+    lines = template.split('\n')
+    return (arity, arity, '{body}' in (line.strip() for line in lines), len(lines) > 1)
+
+def register_semantic_template(name, template):
+    """Adds (or replaces) a table-driven semantic token expansion."""
+    if not re.fullmatch(r"[A-Z][A-Z0-9_]{1,31}", name):
+        raise CodeQuiltDecodeError(f"Invalid semantic token name: {name!r}")
+    try:
+        fields = {field for _, field, _, _ in string.Formatter().parse(template) if field is not None}
+    except ValueError as e:
+        raise CodeQuiltDecodeError(f"Invalid template for semantic token {name}: {e}")
+    unknown = {field for field in fields if not field.isdigit() and field != 'body'}
+    if unknown:
+        raise CodeQuiltDecodeError(f"Invalid template fields for semantic token {name}: {sorted(unknown)}")
+    SEMANTIC_TEMPLATES[name] = template
+    KNOWN_SEMANTIC_TOKENS.add(name)
+    _invalidate_default_context()
+
+def load_semantic_templates(path):
+    """Registers semantic templates from a JSON list of {"name", "template"} objects."""
+    with open(path, 'r', encoding='utf-8') as f:
+        definitions = json.load(f)
+    for definition in definitions:
+        register_semantic_template(definition['name'], definition['template'])
+    return [definition['name'] for definition in definitions]
+
+for _name, _template in SEMANTIC_TEMPLATES.items():
+    KNOWN_SEMANTIC_TOKENS.add(_name)
+
+# --- Shared Decode State ---
+# Everything that does not change while a body is decoded lives in immutable
+# objects that any number of threads can share: DecodeContext (the spec tables
+# and compiled regexes) and QuiltHeader (one quilt's parsed header). The
+# CodeQuiltDecoder instance itself is only the per-call cursor.
+
+class _Frozen:
+    """Base for objects that cannot be modified once built."""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def _init(self, **fields):
+        for name, value in fields.items():
+            object.__setattr__(self, name, value)
+
+class DecodeContext(_Frozen):
+    """Immutable spec tables for one version: corpus, fixed tokens, semantic tokens, regexes, parser tables."""
+    __slots__ = ('spec_version', 'corpus', 'fixed_tokens', 'fixed_values', 'indent_tokens', 'line_start_kinds', 'log_levels',
+                 'semantic_names', 'semantic_templates', 'semantic_signatures', 're_ref', 're_semantic_start', 're_number',
+                 're_escape_hatch', 're_identifier', 'parser', 'token_dispatch', 'param_dispatch', 'token_patterns')
+
+    def __init__(self, spec_version=SPEC_VERSION, corpus=None, fixed_tokens=None, semantic_templates=None,
+                 semantic_names=None, parser=None):
+        fixed_tokens = dict(FIXED_TOKEN_MAP if fixed_tokens is None else fixed_tokens)
+        semantic_templates = dict(SEMANTIC_TEMPLATES if semantic_templates is None else semantic_templates)
+        semantic_names = set(KNOWN_SEMANTIC_TOKENS if semantic_names is None else semantic_names)
+        parser = parser or DEFAULT_PARSER
+        if parser not in PARSERS:
+            raise CodeQuiltDecodeError(f"Unknown parser {parser!r} (expected one of {', '.join(PARSERS)})")
+        if parser == 'table' and cq_tables is None:
+            raise CodeQuiltDecodeError("Parser tables (cq_tables.py) not found; run gen_parser.py")
+        patterns = {kind: re.compile(source) for kind, source in cq_tables.PATTERNS.items()} if cq_tables else {}
+        # Only try NAME( where a known name can start; other names fall through anyway
+        name_starts = {name[0] for name in semantic_names | set(semantic_templates)}
+        def compile_dispatch(table):
+            return MappingProxyType({
+                char: tuple((kind, patterns.get(kind)) for kind in kinds if kind != 'semantic_token' or char in name_starts)
+                for char, kinds in table.items()
+            })
+        self._init(
+            spec_version=spec_version,
+            corpus=MappingProxyType(dict(CORPUS_DICT if corpus is None else corpus)),
+            fixed_tokens=MappingProxyType(fixed_tokens),
+            fixed_values=frozenset(fixed_tokens.values()),
+            indent_tokens=MappingProxyType(dict(INDENT_TOKENS)),
+            line_start_kinds=MappingProxyType(dict(LINE_START_KINDS)),
+            log_levels=MappingProxyType(dict(LOG_LEVELS)),
+            semantic_names=frozenset(semantic_names | set(semantic_templates)),
+            semantic_templates=MappingProxyType(semantic_templates),
+            semantic_signatures=MappingProxyType({
+                **SEMANTIC_SIGNATURES,
+                **{name: template_signature(template) for name, template in semantic_templates.items()},
+            }),
+            re_ref=RE_REF,
+            re_semantic_start=RE_SEMANTIC_START,
+            re_number=RE_NUMBER,
+            re_escape_hatch=RE_ESCAPE_HATCH,
+            re_identifier=RE_IDENTIFIER,
+            parser=parser,
+            token_dispatch=compile_dispatch(cq_tables.DISPATCH if cq_tables else {}),
+            param_dispatch=compile_dispatch(cq_tables.PARAM_DISPATCH if cq_tables else {}),
+            token_patterns=MappingProxyType(patterns),
+        )
 
-    def _parse_header_list_or_dict(self, field_value, entry_sep=',', kv_sep='='):
+_default_context = None
+
+def default_context():
+    """The shared DecodeContext for the module tables; rebuilt after templates are registered."""
+    global _default_context
+    context = _default_context
+    if context is None:
+        # Racing threads may each build one; they are equal and immutable, so either wins
+        context = _default_context = DecodeContext()
+    return context
+
+def _invalidate_default_context():
+    global _default_context
+    _default_context = None
+
+class QuiltHeader(_Frozen):
+    """Immutable parsed header of one quilt (D:/X:/O: maps and derived options)."""
+    __slots__ = ('fields', 'dynamic_map', 'literal_map', 'options', 'literal_threshold', 'keep_comments')
+
+    def __init__(self, fields, dynamic_map, literal_map, options, literal_threshold, keep_comments):
+        self._init(fields=MappingProxyType(dict(fields)), dynamic_map=MappingProxyType(dict(dynamic_map)),
+                   literal_map=MappingProxyType(dict(literal_map)), options=MappingProxyType(dict(options)),
+                   literal_threshold=literal_threshold, keep_comments=keep_comments)
+
+    @staticmethod
+    def _parse_list_or_dict(field_value, entry_sep=',', kv_sep='='):
         """Helper to parse bracketed, separated lists or dicts from header."""
         if not (field_value.startswith('[') and field_value.endswith(']')):
             raise CodeQuiltDecodeError(f"Invalid field format: Missing brackets in '{field_value}'")
@@ -173,8 +347,10 @@ class CodeQuiltDecoder:
         else:
             return [item.strip() for item in entries if item.strip()]
 
-    def _parse_header(self, header_str):
-        """Parses the CodeQuilt header string."""
+    @classmethod
+    def parse(cls, header_str, context=None, strict=False):
+        """Parses the CodeQuilt header string; `strict` turns warnings into errors."""
+        context = context or default_context()
         if not (header_str.startswith('[') and header_str.endswith(']')):
             raise CodeQuiltDecodeError("Invalid header format: Missing brackets.")
 
@@ -195,25 +371,33 @@ class CodeQuiltDecoder:
         # Validate required V field
         if 'V' not in header_data:
             raise CodeQuiltDecodeError("Missing required header field: V")
-        if header_data['V'] != SPEC_VERSION:
-             print(f"Warning: Header version '{header_data['V']}' does not match tool's expected version '{SPEC_VERSION}'. Proceeding with caution.", file=sys.stderr)
+        if header_data['V'] != context.spec_version:
+             if strict:
+                 raise CodeQuiltDecodeError(f"Unknown version '{header_data['V']}' (expected '{context.spec_version}')")
+             print(f"Warning: Header version '{header_data['V']}' does not match tool's expected version '{context.spec_version}'. Proceeding with caution.", file=sys.stderr)
              # Allow processing but warn. For strict mode, raise error here.
 
-        self.header = header_data
+        dynamic_map = {}
+        literal_map = {}
+        options = {}
+        literal_threshold = DEFAULT_LITERAL_THRESHOLD
+        keep_comments = False
 
         # Parse D: field
-        if 'D' in self.header:
-            d_entries = self._parse_header_list_or_dict(self.header['D'])
+        if 'D' in header_data:
+            d_entries = cls._parse_list_or_dict(header_data['D'])
             for key, val in d_entries.items():
                 if not re.fullmatch(r"d\d+", key):
                     raise CodeQuiltDecodeError(f"Invalid dynamic dictionary key: {key}")
-                if not re.fullmatch(RE_IDENTIFIER, val):
+                if not context.re_identifier.fullmatch(val):
+                     if strict:
+                         raise CodeQuiltDecodeError(f"Dynamic dictionary value '{val}' for key '{key}' is not a Python identifier")
                      print(f"Warning: Dynamic dictionary value '{val}' for key '{key}' may not be a standard Python identifier.", file=sys.stderr)
-                self.dynamic_map[key] = val
+                dynamic_map[key] = val
 
         # Parse X: field
-        if 'X' in self.header:
-            x_entries = self._parse_header_list_or_dict(self.header['X'])
+        if 'X' in header_data:
+            x_entries = cls._parse_list_or_dict(header_data['X'])
             for key, b64_val in x_entries.items():
                 if not re.fullmatch(r"l\d+", key):
                     raise CodeQuiltDecodeError(f"Invalid literal dictionary key: {key}")
@@ -223,44 +407,123 @@ class CodeQuiltDecoder:
                     if missing_padding:
                         b64_val += '=' * (4 - missing_padding)
                     decoded_bytes = base64.b64decode(b64_val, validate=True)
-                    self.literal_map[key] = decoded_bytes.decode('utf-8') # Assume UTF-8
+                    literal_map[key] = decoded_bytes.decode('utf-8') # Assume UTF-8
                 except (base64.binascii.Error, UnicodeDecodeError, ValueError) as e:
                     raise CodeQuiltDecodeError(f"Failed to decode Base64 for {key}: {e}")
 
         # Parse O: field
-        if 'O' in self.header:
-            o_entries = self._parse_header_list_or_dict(self.header['O'], kv_sep=None) # Treat as list first
+        if 'O' in header_data:
+            o_entries = cls._parse_list_or_dict(header_data['O'], kv_sep=None) # Treat as list first
             for entry in o_entries:
                 if '=' in entry:
                     opt_key, opt_val = entry.split('=', 1)
-                    self.options[opt_key] = opt_val
+                    options[opt_key] = opt_val
                 else:
-                    self.options[entry] = True # Flag options
+                    options[entry] = True # Flag options
 
-            if 'lth' in self.options:
+            if 'lth' in options:
                 try:
-                    self.literal_threshold = int(self.options['lth'])
+                    literal_threshold = int(options['lth'])
                 except ValueError:
-                    raise CodeQuiltDecodeError(f"Invalid value for option lth: {self.options['lth']}")
-            if self.options.get('cmt') == 'k':
-                self.keep_comments = True
+                    raise CodeQuiltDecodeError(f"Invalid value for option lth: {options['lth']}")
+            if options.get('cmt') == 'k':
+                keep_comments = True
 
         # Parse I: field (store for potential future use/info)
-        if 'I' in self.header:
-            self.header['import_list'] = self._parse_header_list_or_dict(self.header['I'], kv_sep=None)
+        if 'I' in header_data:
+            header_data['import_list'] = tuple(cls._parse_list_or_dict(header_data['I'], kv_sep=None))
 
         # Parse C: field (store for potential future use/verification)
-        if 'C' in self.header:
-            if '-' not in self.header['C']:
-                 raise CodeQuiltDecodeError(f"Invalid checksum format: {self.header['C']}")
+        if 'C' in header_data:
+            if '-' not in header_data['C']:
+                 raise CodeQuiltDecodeError(f"Invalid checksum format: {header_data['C']}")
             # Further validation could check algo/hash format
 
+        return cls(header_data, dynamic_map, literal_map, options, literal_threshold, keep_comments)
+
+class ValidationResult:
+    """Outcome of CodeQuiltDecoder.validate(); truthy when the quilt is well-formed."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def __bool__(self):
+        return self.ok
+
+    def __repr__(self):
+        return f"ValidationResult(ok={self.ok}, errors={self.errors!r})"
+
+BRACKET_PAIRS = {'(': ')', '[': ']', '{': '}'}
+
+# --- Checkpoint / Resume ---
+CHECKPOINT_FORMAT = 1
+TRUNCATION_SLACK = 4 # A lex error this close to the end of a partial body is truncation (e.g. '\\u00')
+NAME_CHARS = frozenset(string.ascii_uppercase + string.digits + '_') # Characters of a semantic token name
+
+class CodeQuiltDecoder:
+    """
+    Decodes a CodeQuilt v0.7.1 string into Python code.
+
+    `codequilt_string` may also be a binary quilt (bytes, see quilt_binary.py),
+    whose tokens are read instead of lexed.
+
+    An instance is a cheap per-call cursor (body position, indentation, output);
+    the spec tables come from a shared DecodeContext and the parsed header is an
+    immutable QuiltHeader, so instances never share mutable state.
+    """
+
+    def __init__(self, codequilt_string, context=None):
+        self.context = context or default_context()
+        self.codequilt_string = codequilt_string
+        self.quilt_header = None
+        self.header = {}
+        self.body = ""
+        self.dynamic_map = {}
+        self.literal_map = {}
+        self.options = {}
+        self.literal_threshold = DEFAULT_LITERAL_THRESHOLD
+        self.keep_comments = False
+        self.indent_level = 0
+        self.indent_spaces = "    " # Standard Python indent
+        self.output = StringIO()
+        self.last_char = '' # Last character written, so spacing never has to read the output back
+        self.needs_indent = False
+        self.pos = 0 # Current position in the body string
+        self.nesting_depth = 0 # Semantic tokens currently being parsed
+        self._hatch_search = (None, 0, -1) # (body, searched from, first "}'" found) for _hatch_terminator
+        self.body_offset = 0 # Where self.body starts in the full quilt body (non-zero after resume())
+        self.partial = False # Set by decode_partial(): an unclosed L'{ is truncation, not L + string
+        self._started = False
+        self._binary_tokens = None # Token iterator when decoding a binary quilt (quilt_binary.py)
+
+    def _use_header(self, quilt_header):
+        """Points this cursor at an already-parsed (shareable) header."""
+        self.quilt_header = quilt_header
+        self.header = quilt_header.fields
+        self.dynamic_map = quilt_header.dynamic_map
+        self.literal_map = quilt_header.literal_map
+        self.options = quilt_header.options
+        self.literal_threshold = quilt_header.literal_threshold
+        self.keep_comments = quilt_header.keep_comments
+
+    def _parse_header(self, header_str):
+        """Parses the CodeQuilt header string."""
+        self._use_header(QuiltHeader.parse(header_str, self.context))
+
     def _write(self, text):
         """Writes text to output, handling indentation."""
         if self.needs_indent:
-            self.output.write(self.indent_spaces * self.indent_level)
+            if self.indent_level:
+                self.output.write(self.indent_spaces * self.indent_level)
+                self.last_char = ' '
             self.needs_indent = False
         self.output.write(text)
+        if text:
+            self.last_char = text[-1]
 
     def _write_token(self, token_text, spacing='heuristic'):
         """Writes a token with potential spacing."""
@@ -270,18 +533,18 @@ class CodeQuiltDecoder:
         space_before = False
         space_after = False
 
-        last_char = self.output.getvalue()[-1:] if self.output.tell() > 0 else ''
+        last_char = self.last_char
 
         # Crude spacing - black formatter is preferred
         if spacing == 'heuristic':
-             is_alphanum_token = token_text[0].isalnum() or token_text[0]=='_'
+             is_alphanum_token = token_text[:1].isalnum() or token_text[:1]=='_' # An empty D: name is warned about, not fatal
              is_symbol = not is_alphanum_token and token_text not in ['\n','_INDENT_','_DEDENT_']
 
              if is_alphanum_token and last_char.isalnum():
                  space_before = True
              elif is_symbol and token_text in '+-*/%<>=&|~!' and last_char.isalnum():
                  space_before = True
-             elif is_alphanum_token and last_char in '+-*/%<>=&|~!':
+             elif is_alphanum_token and last_char and last_char in '+-*/%<>=&|~!': # '' is "in" every string
                  space_before = True
 
 
@@ -291,7 +554,7 @@ class CodeQuiltDecoder:
 
              # Space after most keywords/operators
              if token_text in ['def', 'class', 'return', 'if', 'elif', 'else', 'for', 'while', 'try', 'except', 'finally', 'with', 'import', 'from', 'await', 'async', 'raise', 'assert', 'global', 'lambda', 'yield', 'and', 'or', 'not', 'is', 'in'] \
-                or token_text in FIXED_TOKEN_MAP.values() and token_text.strip() in '+-*/%=<>!&|~^':
+                or token_text in self.context.fixed_values and token_text.strip() in '+-*/%=<>!&|~^':
                  self._write(" ")
 
         elif spacing == 'literal':
@@ -411,10 +674,29 @@ class CodeQuiltDecoder:
     def _parse_semantic_token(self, name):
         """Parses parameters and potential body of a semantic token."""
         # Expects '(' to be consumed already
+        if self.nesting_depth >= MAX_NESTING_DEPTH:
+            raise CodeQuiltDecodeError(f"Semantic token {name} nested deeper than {MAX_NESTING_DEPTH} levels at pos {self.pos}")
+        self.nesting_depth += 1
+        try:
+            if self.context.parser == 'table':
+                return self._parse_semantic_token_table(name)
+            return self._parse_semantic_token_parts(name)
+        finally:
+            self.nesting_depth -= 1
+
+    def _parse_semantic_token_parts(self, name):
+        """Body of _parse_semantic_token() for the hand parser, run inside its nesting guard."""
         params = []
         body_tokens = None
 
         # Parse parameters until ')' or ':{'
+        if name == "LOG":
+            # The level is a bare letter (LOG(e:...)), which is not a body token elsewhere
+            level = self._peek(2)
+            if level and level[0] in self.context.log_levels and level[1] in ':)':
+                params.append({'type': 'log_level', 'value': self._consume(), 'pos': self.pos - 1})
+                if self._peek() == ':':
+                    self._consume()
         while self.pos < len(self.body):
              # Need to parse the *next* full token to be a parameter
              param_token = self._parse_next_token(in_semantic_param=True)
@@ -482,17 +764,18 @@ class CodeQuiltDecoder:
         # Example Expansions (based on reduced spec):
         if name == "LOG":
             if len(resolved_params) < 2: raise CodeQuiltDecodeError("LOG needs at least level and format string")
-            lvl_map = {'i': 'info', 'd': 'debug', 'e': 'error', 'w': 'warning', 'c': 'critical'}
-            level = lvl_map.get(resolved_params[0])
+            level = self.context.log_levels.get(resolved_params[0])
             if not level: raise CodeQuiltDecodeError(f"Invalid LOG level: {resolved_params[0]}")
             fmt = resolved_params[1]
             args = resolved_params[2:]
             args_str = ", ".join(args)
-            self._write_token(f"{CORPUS_DICT['c105']}.{level}({fmt}" + (f", {args_str}" if args_str else "") + ")", spacing='none')
+            self._write_token(f"{self.context.corpus['c105']}.{level}({fmt}" + (f", {args_str}" if args_str else "") + ")", spacing='none')
 
         elif name == "ATTR":
              if len(resolved_params) != 3: raise CodeQuiltDecodeError("ATTR needs object, attribute, and value")
              obj, attr, val = resolved_params
+             if attr[:1] in ('"', "'") and attr[1:-1].isidentifier():
+                 attr = attr[1:-1] # ATTR(c18:'_count':0) names the attribute with a string
              # Need to be careful if attr is a plain string or ref
              # Assuming params are resolved to Python code snippets here
              self._write_token(f"{obj}.{attr} = {val}", spacing='none') # Let black handle spacing
@@ -530,25 +813,53 @@ class CodeQuiltDecoder:
              self.indent_level += 1
              self._write('\n'); self.needs_indent = True
              log_msg = f'f"FAIL: {{{err_var}}}"' # Format string for the error
-             self._write_token(f"{CORPUS_DICT['c105']}.error({log_msg}, exc_info=True)", spacing='none')
+             self._write_token(f"{self.context.corpus['c105']}.error({log_msg}, exc_info=True)", spacing='none')
              self.indent_level -= 1
              self._write('\n')
              self.needs_indent = True # Prepare for next line after except block
 
-        # Add other semantic token expansions (RETF, RAISE, DGET, DBEXEC, etc.) following the spec patterns
-        # ... (implementation detail for each semantic token) ...
+        # Add other semantic token expansions (RAISE, DBEXEC, etc.) following the spec patterns,
+        # either here or as SEMANTIC_TEMPLATES entries
+
+        elif name in self.context.semantic_templates:
+             self._expand_semantic_template(name, self.context.semantic_templates[name], resolved_params, body_tokens)
 
         else:
              print(f"Warning: Unsupported semantic token '{name}'. Ignoring.", file=sys.stderr)
 
 
+    def _expand_semantic_template(self, name, template, resolved_params, body_tokens):
+        """Writes a table-driven semantic expansion (see SEMANTIC_TEMPLATES)."""
+        arity = semantic_template_arity(template)
+        if len(resolved_params) != arity:
+            raise CodeQuiltDecodeError(f"{name} needs {arity} parameter(s), got {len(resolved_params)}")
+        lines = template.split('\n')
+        if '{body}' in (line.strip() for line in lines) and body_tokens is None:
+            raise CodeQuiltDecodeError(f"{name} requires a body block {{}}")
+
+        base_level = self.indent_level
+        for i, line in enumerate(lines):
+            stripped = line.lstrip(' ')
+            if i > 0 and not self.needs_indent:
+                self._write('\n'); self.needs_indent = True
+            self.indent_level = base_level + (len(line) - len(stripped)) // 4
+            if stripped == '{body}':
+                for token in body_tokens:
+                    self._process_token(token)
+            else:
+                self._write_token(stripped.format(*resolved_params), spacing='none')
+        self.indent_level = base_level
+        if len(lines) > 1 and not self.needs_indent:
+            self._write('\n') # Multi-line expansions end their own line, like RETN
+            self.needs_indent = True
+
     def _resolve_token_value(self, token_struct):
          """Converts a parsed token structure back into its Python string representation."""
          token_type = token_struct['type']
          token_value = token_struct['value']
 
          if token_type == 'corpus_ref':
-             return CORPUS_DICT.get(token_value, f"__UNKNOWN_CORPUS_{token_value}__")
+             return self.context.corpus.get(token_value, f"__UNKNOWN_CORPUS_{token_value}__")
          elif token_type == 'dynamic_ref':
              return self.dynamic_map.get(token_value, f"__UNKNOWN_DYNAMIC_{token_value}__")
          elif token_type == 'literal_ref':
@@ -559,7 +870,7 @@ class CodeQuiltDecoder:
              else:
                  return repr(lit) # Use repr for safe string/bytes representation
          elif token_type == 'fixed_token':
-             py_val = FIXED_TOKEN_MAP.get(token_value)
+             py_val = self.context.fixed_tokens.get(token_value)
              # Handle structural tokens that shouldn't be directly resolved as values
              if py_val in ['_INDENT_', '_DEDENT_', '\n']: return f"__STRUCTURAL_{token_value}__"
              return py_val.strip() # Return the Python equivalent, strip spaces added for parsing convenience
@@ -571,12 +882,22 @@ class CodeQuiltDecoder:
              return "None"
          elif token_type == 'escape_hatch':
              return token_struct['raw_code'] # Return raw code from escape hatch
+         elif token_type == 'log_level':
+             return token_value
          else:
              return f"__UNRESOLVED_{token_type}_{token_value}__"
 
 
     def _parse_next_token(self, in_semantic_param=False, in_semantic_body=False):
-         """Parses the next token from the current body position."""
+        """Parses the next token from the current body position with the context's parser."""
+        if self._binary_tokens is not None: # Already lexed
+            return next(self._binary_tokens, None)
+        if self.context.parser == 'table':
+            return self._parse_next_token_table(in_semantic_param)
+        return self._parse_next_token_hand(in_semantic_param, in_semantic_body)
+
+    def _parse_next_token_hand(self, in_semantic_param=False, in_semantic_body=False):
+         """Parses the next token from the current body position (hand-written lexer)."""
          # Skip whitespace between tokens
          while self.pos < len(self.body) and self.body[self.pos].isspace():
              self.pos += 1
@@ -588,7 +909,7 @@ class CodeQuiltDecoder:
          char = self.body[self.pos]
 
          # 1. Check for References (c<n>, d<n>, l<n>)
-         ref_match = RE_REF.match(self.body, self.pos)
+         ref_match = self.context.re_ref.match(self.body, self.pos)
          if ref_match:
              ref_type_char = ref_match.group(1)
              ref_key = ref_match.group(0)
@@ -598,16 +919,14 @@ class CodeQuiltDecoder:
 
          # 2. Check for Semantic Tokens (NAME(...) or NAME(...){...})
          #    Avoid matching if inside a parameter list already unless nested semantics allowed
-         sem_match = RE_SEMANTIC_START.match(self.body, self.pos)
-         # Also check it's not just an uppercase fixed token like 'D' or 'C'
-         is_fixed = char in FIXED_TOKEN_MAP and len(char) == 1 and char.isupper()
+         #    The regex needs 2+ name chars, so single fixed tokens like 'D(' never match;
+         #    names starting with a fixed-token letter (LOG, TRYLOG, RETN, ...) must.
+         sem_match = self.context.re_semantic_start.match(self.body, self.pos)
 
-         if sem_match and not is_fixed:
+         if sem_match:
               name = sem_match.group(1)
               # Check if name is one of the defined semantic tokens
-              # (could precompute a set of valid semantic token names)
-              KNOWN_SEMANTIC_TOKENS = {"LOG", "TRYLOG", "RETN", "RETF", "RAISE", "ATTR", "DGET", "DBEXEC", "DBFETCH1", "CHKEXIT", "CHKINIT", "PATHJOIN", "MKDIRS"}
-              if name in KNOWN_SEMANTIC_TOKENS:
+              if name in self.context.semantic_names:
                   self._consume(len(name) + 1) # Consume NAME and '('
                   parsed_name, params, body_tokens_list = self._parse_semantic_token(name)
                   # Store the parsed structure, including params/body as raw token structures
@@ -615,18 +934,21 @@ class CodeQuiltDecoder:
               # else: Not a known semantic token, might be regular function call
 
          # 3. Check for Escape Hatch L'{...}'
-         #    Use regex from start of current position
-         hatch_match = RE_ESCAPE_HATCH.match(self.body, self.pos)
-         if hatch_match:
-             raw_code = hatch_match.group(1)
+         #    Same match as RE_ESCAPE_HATCH, but the terminator search is shared
+         #    between hatches so a run of unclosed L'{ does not rescan the body
+         hatch_end = self._hatch_terminator(self.pos + 3) if self.body.startswith("L'{", self.pos) else -1
+         if hatch_end < 0 and self.partial and self.body.startswith("L'{", self.pos):
+             raise CodeQuiltTruncatedError(f"Unterminated escape hatch starting at pos {self.pos}")
+         if hatch_end >= 0:
+             raw_code = self.body[self.pos + 3:hatch_end]
              # Unescape \\ -> \, \} -> }, \{ -> { within raw_code
              unescaped_code = raw_code.replace("\\}", "}").replace("\\{", "{").replace("\\\\", "\\")
-             self._consume(len(hatch_match.group(0)))
-             return {'type': 'escape_hatch', 'value': hatch_match.group(0), 'raw_code': unescaped_code, 'pos': start_pos}
+             hatch_text = self._consume(hatch_end + 2 - self.pos)
+             return {'type': 'escape_hatch', 'value': hatch_text, 'raw_code': unescaped_code, 'pos': start_pos}
 
          # 4. Check for Literals (Numbers, Strings, Bytes, t/f/n)
          # Number literal
-         num_match = RE_NUMBER.match(self.body, self.pos)
+         num_match = self.context.re_number.match(self.body, self.pos)
          if num_match:
              num_str = num_match.group(0)
              self._consume(len(num_str))
@@ -662,7 +984,7 @@ class CodeQuiltDecoder:
          # Prioritize longer potential tokens? No, spec implies single chars mostly.
          # Need to handle multi-char operators if they weren't mapped to single chars?
          # The reduced spec implies things like == are two tokens: = =
-         if char in FIXED_TOKEN_MAP:
+         if char in self.context.fixed_tokens:
              self._consume(1)
              return {'type': 'fixed_token', 'value': char, 'pos': start_pos}
 
@@ -676,13 +998,138 @@ class CodeQuiltDecoder:
          # If nothing matched, it's an unknown token
          raise CodeQuiltDecodeError(f"Unknown or invalid token starting with '{self.body[self.pos]}' at position {self.pos}")
 
+    # --- Table-driven Parser (tables from gen_parser.py) ---
+
+    def _skip_whitespace(self):
+        """Moves past whitespace; returns the next body char or None at the end."""
+        self.pos = RE_WHITESPACE.match(self.body, self.pos).end()
+        return self.body[self.pos] if self.pos < len(self.body) else None
+
+    def _parse_next_token_table(self, in_semantic_param=False):
+        """
+        Parses the next token with the tables generated from the EBNF grammar.
+
+        The first char selects the productions that can start there, in grammar
+        order, and each is a single anchored regex match, so no body char is
+        scanned more than a bounded number of times.
+        """
+        char = self._skip_whitespace()
+        if char is None:
+            return None
+        start_pos = self.pos
+        dispatch = self.context.param_dispatch if in_semantic_param else self.context.token_dispatch
+        for kind, pattern in dispatch.get(char, ()):
+            if kind == 'fixed_token':
+                self.pos += 1
+                return {'type': 'fixed_token', 'value': char, 'pos': start_pos}
+            match = pattern.match(self.body, start_pos)
+            if kind == 'string_literal':
+                if match is None or '\\' in match.group(0):
+                    self.pos += 1 # Escapes are decoded (and bad ones reported) by the hand routine
+                    return {'type': kind, 'value': self._parse_string_literal(char), 'pos': start_pos}
+                return self._literal_token(kind, match, 2)
+            if match is None:
+                if kind == 'escape_hatch' and self.body.startswith("L'{", start_pos):
+                    self._reject_escape_hatch(start_pos)
+                elif kind == 'bytes_literal' and self.body[start_pos + 1:start_pos + 2] in ('"', "'"):
+                    self.pos += 2
+                    self._parse_bytes_literal(self.body[start_pos + 1]) # Raises for an unterminated literal
+                    raise CodeQuiltDecodeError(f"Unsupported escape sequence in bytes literal at pos {start_pos} (only string escapes are allowed)")
+                continue
+            if kind == 'semantic_token':
+                name = match.group(0)[:-1]
+                if name not in self.context.semantic_names:
+                    continue # Regular call, e.g. D d0 (
+                self.pos = match.end()
+                parsed_name, params, body_tokens_list = self._parse_semantic_token(name)
+                return {'type': 'semantic_token', 'value': parsed_name, 'params': params, 'body': body_tokens_list, 'pos': start_pos}
+            if kind == 'escape_hatch':
+                self.pos = match.end()
+                raw_code = RE_HATCH_ESCAPE.sub(r"\1", match.group(0)[3:-2])
+                return {'type': 'escape_hatch', 'value': match.group(0), 'raw_code': raw_code, 'pos': start_pos}
+            if kind == 'bytes_literal':
+                return self._literal_token(kind, match, 3)
+            self.pos = match.end()
+            return {'type': kind, 'value': match.group(0), 'pos': start_pos}
+        raise CodeQuiltDecodeError(f"Unknown or invalid token starting with '{char}' at position {start_pos}")
+
+    def _literal_token(self, kind, match, quoting):
+        """Token for a matched string/bytes literal; warns above the O:[lth] threshold like the hand lexer."""
+        literal = match.group(0)
+        self.pos = match.end()
+        if len(literal) - quoting > self.literal_threshold:
+            what = 'string' if kind == 'string_literal' else 'bytes'
+            print(f"Warning: Inline {what} literal '{literal[:20]}...' exceeds threshold {self.literal_threshold} at pos {match.start()}", file=sys.stderr)
+        return {'type': kind, 'value': literal, 'pos': match.start()}
+
+    def _reject_escape_hatch(self, start_pos):
+        """Called when L'{ does not match the grammar's escape hatch; raises unless it is L followed by a string."""
+        if self._hatch_terminator(start_pos + 3) >= 0:
+            raise CodeQuiltDecodeError(f"Invalid escape hatch at pos {start_pos}: '{{', '}}' and '\\' inside L'{{...}}' must be escaped")
+        if self.partial:
+            raise CodeQuiltTruncatedError(f"Unterminated escape hatch starting at pos {start_pos}")
+
+    def _parse_semantic_token_table(self, name):
+        """NAME( parameter (':' parameter)* [':' '{' body-tokens '}'] ')' with NAME( already consumed."""
+        params = []
+        if name == "LOG":
+            # The level is a bare letter (LOG(e:...)), which is not a body token elsewhere
+            level = self._peek(2)
+            if level and level[0] in self.context.log_levels and level[1] in ':)':
+                params.append({'type': 'log_level', 'value': self._consume(), 'pos': self.pos - 1})
+                if self._peek() == ':':
+                    self._consume()
+        while True:
+            param_token = self._parse_next_token(in_semantic_param=True)
+            if param_token is None:
+                raise CodeQuiltDecodeError(f"Unterminated parameter list for semantic token {name}")
+            params.append(param_token)
+            next_char = self._skip_whitespace()
+            if next_char == ')':
+                self._consume()
+                return name, params, None
+            if next_char is None:
+                raise CodeQuiltDecodeError(f"Unterminated parameter list or body for semantic token {name}")
+            if next_char != ':':
+                raise CodeQuiltDecodeError(f"Expected ':' or ')' after parameter in semantic token {name}, got '{next_char}'")
+            self._consume()
+            if self._skip_whitespace() == '{':
+                self._consume()
+                body_tokens = self._parse_block_body(name)
+                if self._skip_whitespace() != ')':
+                    raise CodeQuiltDecodeError(f"Expected ')' after body block {{...}} in semantic token {name}")
+                self._consume()
+                return name, params, body_tokens
+
+    def _parse_block_body(self, name):
+        """body-tokens up to the '}' that closes a semantic block; '{'/'}' tokens inside must balance."""
+        body_tokens = []
+        depth = 0
+        while True:
+            token = self._parse_next_token()
+            if token is None:
+                raise CodeQuiltDecodeError(f"Unterminated body block {{...}} for semantic token {name}")
+            if token['type'] == 'fixed_token' and token['value'] in '{}':
+                if token['value'] == '}' and depth == 0:
+                    return body_tokens
+                depth += 1 if token['value'] == '{' else -1
+            body_tokens.append(token)
+
+    def _hatch_terminator(self, start):
+        """Index of the first "}'" at or after `start`, or -1 (searches each stretch of the body once)."""
+        body, searched_from, found = self._hatch_search
+        if body is not self.body or start < searched_from or -1 < found < start:
+            found = self.body.find("}'", start)
+            self._hatch_search = (self.body, start, found)
+        return found
+
     def _process_token(self, token_struct):
         """Processes a single parsed token structure and writes output."""
         token_type = token_struct['type']
         token_value = token_struct['value']
 
         if token_type == 'corpus_ref':
-            self._write_token(CORPUS_DICT.get(token_value, f"__UNKNOWN_CORPUS_{token_value}__"))
+            self._write_token(self.context.corpus.get(token_value, f"__UNKNOWN_CORPUS_{token_value}__"))
         elif token_type == 'dynamic_ref':
              self._write_token(self.dynamic_map.get(token_value, f"__UNKNOWN_DYNAMIC_{token_value}__"))
         elif token_type == 'literal_ref':
@@ -691,7 +1138,7 @@ class CodeQuiltDecoder:
             if self.keep_comments and lit.strip().startswith('#'):
                 # Write comment, ensuring it's on its own line or appropriately placed
                 # This heuristic might need refinement based on how comments are stored/intended
-                if not self.output.getvalue().endswith('\n') and self.output.tell() > 0:
+                if self.last_char not in ('', '\n'):
                      self._write('\n')
                      self.needs_indent = True
                 self._write_token(lit, spacing='none') # Write comment content
@@ -702,11 +1149,19 @@ class CodeQuiltDecoder:
                  self._write_token(repr(lit), spacing='literal')
 
         elif token_type == 'fixed_token':
-            py_val = FIXED_TOKEN_MAP.get(token_value)
+            py_val = self.context.fixed_tokens.get(token_value)
+            line_start_kind = self.context.line_start_kinds.get(token_value) if self.needs_indent else None
+            if line_start_kind == 'decorator_prefix':
+                self._write_token(token_value, spacing='none') # N@c47 is a decorator, not ' in '
+                return
+            if line_start_kind == 'structure':
+                py_val = self.context.indent_tokens[token_value] # Nothing written on this line yet
             if py_val == '\n':
                 self._write('\n')
                 self.needs_indent = True
             elif py_val == '_INDENT_':
+                if self.indent_level >= MAX_INDENT_LEVEL:
+                    raise CodeQuiltDecodeError(f"More than {MAX_INDENT_LEVEL} indentation levels at pos {token_struct['pos']}")
                 self.indent_level += 1
                 # Don't write anything, affects next line's indent calculation
             elif py_val == '_DEDENT_':
@@ -741,20 +1196,135 @@ class CodeQuiltDecoder:
              print(f"Warning: Unhandled token type '{token_type}' in _process_token. Ignoring.", file=sys.stderr)
 
 
-    def decode(self):
-        """Performs the decoding process."""
+    def _validate_tokens(self, tokens, errors, line_start=True):
+        """Checks refs, brackets, indentation and semantic arity of one token sequence."""
+        context = self.context
+        level = 0
+        brackets = []
+        for token in tokens:
+            token_type, token_value, pos = token['type'], token['value'], token['pos']
+            if token_type == 'corpus_ref' and token_value not in context.corpus:
+                errors.append(f"Unknown corpus reference {token_value} at pos {pos}")
+            elif token_type == 'dynamic_ref' and token_value not in self.dynamic_map:
+                errors.append(f"Undefined dynamic reference {token_value} at pos {pos}")
+            elif token_type == 'literal_ref' and token_value not in self.literal_map:
+                errors.append(f"Undefined literal reference {token_value} at pos {pos}")
+            elif token_type == 'fixed_token':
+                if line_start and token_value in context.indent_tokens:
+                    level += 1 if token_value == '>' else -1
+                    if level < 0:
+                        errors.append(f"Dedent below level 0 at pos {pos}")
+                        level = 0
+                    elif level > MAX_INDENT_LEVEL:
+                        errors.append(f"More than {MAX_INDENT_LEVEL} indentation levels at pos {pos}")
+                        level = MAX_INDENT_LEVEL
+                    continue # Still at the start of the line
+                if token_value == 'N':
+                    line_start = True
+                    continue
+                if token_value in BRACKET_PAIRS:
+                    brackets.append((token_value, pos))
+                elif token_value in ')]}':
+                    if brackets and BRACKET_PAIRS[brackets[-1][0]] == token_value:
+                        brackets.pop()
+                    else:
+                        errors.append(f"Unbalanced '{token_value}' at pos {pos}")
+            elif token_type == 'semantic_token':
+                line_start = self._validate_semantic(token, errors)
+                continue
+            line_start = False
+        for bracket, pos in brackets:
+            errors.append(f"Unclosed '{bracket}' at pos {pos}")
+        return line_start
+
+    def _validate_semantic(self, token, errors):
+        """Checks one semantic token; returns whether its expansion ends the line."""
+        name, params, body, pos = token['value'], token['params'], token['body'], token['pos']
+        signature = self.context.semantic_signatures.get(name)
+        if signature is None:
+            errors.append(f"Unsupported semantic token {name} at pos {pos}")
+            return False
+        min_params, max_params, needs_body, ends_line = signature
+        if len(params) < min_params or (max_params is not None and len(params) > max_params):
+            expected = min_params if min_params == max_params else f"{min_params}+" if max_params is None else f"{min_params}-{max_params}"
+            errors.append(f"{name} takes {expected} parameter(s), got {len(params)} at pos {pos}")
+        if needs_body and body is None:
+            errors.append(f"{name} requires a body block {{}} at pos {pos}")
+        elif body is not None and not needs_body:
+            errors.append(f"{name} does not take a body block at pos {pos}")
+        if name == "LOG" and params and params[0]['type'] != 'log_level':
+            errors.append(f"Invalid LOG level at pos {params[0]['pos']}")
+        for param in params:
+            self._validate_tokens([param], errors, line_start=False)
+        if body is not None:
+            self._validate_tokens(body, errors)
+        return ends_line
+
+    def validate(self):
+        """
+        Checks that the quilt is well-formed without decoding it.
+
+        Checks each token as it is lexed (no token list is kept): every c/d/l
+        reference resolves, brackets and semantic bodies balance, N>/N<
+        indentation never goes below zero, semantic tokens have the right arity
+        and V: is this tool's version.
+        Returns a ValidationResult; nothing is written or formatted.
+        """
+        try:
+            header_part = self._split_quilt()
+        except CodeQuiltDecodeError as e:
+            return ValidationResult([str(e)])
+        try:
+            self._use_header(QuiltHeader.parse(header_part, self.context, strict=True))
+        except CodeQuiltDecodeError as e:
+            return ValidationResult([f"Header: {e}"])
+
+        errors = []
+        self.pos = 0
+        self._validate_tokens(self._checked_tokens(errors), errors)
+        return ValidationResult(errors)
+
+    def _checked_tokens(self, errors):
+        """Yields top-level tokens as they are lexed; a lexer error ends the stream."""
+        parse_next_token = self._parse_next_token
+        try:
+            token = parse_next_token()
+            while token is not None:
+                yield token
+                token = parse_next_token()
+        except CodeQuiltDecodeError as e:
+            errors.append(str(e)) # The lexer cannot resynchronize; report what came before
+
+    def _split_quilt(self):
+        """Returns the header string and sets up the body, or the token stream of a binary quilt."""
+        if isinstance(self.codequilt_string, (bytes, bytearray, memoryview)):
+            from quilt_binary import read_binary_quilt
+            header_part, self._binary_tokens = read_binary_quilt(self.codequilt_string, self.context)
+            self.body = ""
+            return header_part
         if '|||' not in self.codequilt_string:
             raise CodeQuiltDecodeError("Invalid CodeQuilt format: Missing '|||' separator.")
-
         header_part, self.body = self.codequilt_string.split('|||', 1)
+        return header_part
+
+    def _start(self):
+        """Splits off and parses the header and puts the cursor at the start of the body."""
+        header_part = self._split_quilt()
 
         self._parse_header(header_part)
 
         # --- Body Processing ---
         self.output = StringIO()
+        self.last_char = ''
         self.indent_level = 0
         self.needs_indent = True # Assume start of file needs indent check (level 0)
         self.pos = 0
+        self._started = True
+
+    def decode(self, format_code=True):
+        """Performs the decoding process."""
+        if not self._started: # A resume()d decoder continues from its checkpoint
+            self._start()
 
         while True:
             token = self._parse_next_token()
@@ -765,13 +1335,382 @@ class CodeQuiltDecoder:
         reconstructed_code = self.output.getvalue()
 
         # Optionally format with black or other formatter
+        if not format_code:
+            return reconstructed_code
         return format_python_code(reconstructed_code) # Use external formatter
 
+    # --- Checkpoint / Resume ---
+
+    def decode_partial(self):
+        """
+        Decodes a possibly truncated quilt up to its last complete statement.
+
+        Tokens after the last safe N are not written; they stay in the
+        checkpoint as `pending` and are lexed again together with the
+        continuation, so a cut inside a literal, semantic token or name is harmless.
+        Returns checkpoint().
+        """
+        if not self._started:
+            self._start()
+        if self._binary_tokens is not None:
+            raise CodeQuiltDecodeError("Binary quilts are never truncated; use decode()")
+
+        held = [] # Tokens since the last statement boundary
+        self._name_run = (0, -1) # (start, end) of the last [A-Z0-9_] run scanned by _ends_statement
+        boundary = self.pos
+        self.partial = True
+        try:
+            while True:
+                try:
+                    token = self._parse_next_token()
+                except CodeQuiltDecodeError as e:
+                    if self._is_truncation(e):
+                        break
+                    raise
+                if token is None:
+                    break
+                held.append(token)
+                if token['type'] == 'fixed_token' and token['value'] == 'N' and self._ends_statement(self.pos):
+                    for held_token in held:
+                        self._process_token(held_token)
+                    held = []
+                    boundary = self.pos
+        finally:
+            self.partial = False
+        self.pos = boundary
+        return self.checkpoint()
+
+    def _is_truncation(self, error):
+        """True if a lex error was caused by the body ending, not by bad syntax."""
+        return isinstance(error, CodeQuiltTruncatedError) or len(self.body) - self.pos < TRUNCATION_SLACK
+
+    def _ends_statement(self, end):
+        """True if an N ending at `end` is final: more input cannot make it part of a NAME( token."""
+        scanned_from, run_end = self._name_run
+        if not scanned_from <= end <= run_end: # Each N in a run like 'NNNN' shares one scan
+            run_end = end
+            while run_end < len(self.body) and self.body[run_end] in NAME_CHARS:
+                run_end += 1
+            self._name_run = (end, run_end)
+        return run_end < len(self.body)
+
+    def _open_structures(self, text):
+        """Lists what is still open at the end of `text`: semantic tokens, brackets, a string or L'{."""
+        stack = []
+        i = 0
+        while i < len(text):
+            if text.startswith("L'{", i):
+                end = text.find("}'", i + 3)
+                if end < 0:
+                    stack.append("L'{")
+                    break
+                i = end + 2
+                continue
+            char = text[i]
+            if char in '\'"':
+                j = i + 1
+                while j < len(text) and text[j] != char:
+                    j += 2 if text[j] == '\\' else 1
+                if j >= len(text):
+                    stack.append(char)
+                    break
+                i = j + 1
+                continue
+            sem_match = self.context.re_semantic_start.match(text, i)
+            if sem_match and sem_match.group(1) in self.context.semantic_names:
+                stack.append(sem_match.group(0))
+                i = sem_match.end()
+                continue
+            if char in BRACKET_PAIRS:
+                stack.append(char)
+            elif stack and char == BRACKET_PAIRS.get(stack[-1][-1]):
+                stack.pop()
+            i += 1
+        return stack
+
+    def checkpoint(self):
+        """
+        Returns the decoder state as a JSON-serializable dict.
+
+        `resume` says where the follow-up generation has to continue: at body
+        offset `offset` (right after `after`), with `open` still unclosed.
+        """
+        quilt_header = self.quilt_header
+        pending = self.body[self.pos:]
+        return {
+            'format': CHECKPOINT_FORMAT,
+            'spec_version': self.context.spec_version,
+            'header': {
+                'fields': dict(quilt_header.fields),
+                'dynamic_map': dict(quilt_header.dynamic_map),
+                'literal_map': dict(quilt_header.literal_map),
+                'options': dict(quilt_header.options),
+                'literal_threshold': quilt_header.literal_threshold,
+                'keep_comments': quilt_header.keep_comments,
+            },
+            'body_offset': self.body_offset + self.pos, # Everything before this is in `output`
+            'indent_level': self.indent_level,
+            'needs_indent': self.needs_indent,
+            'output': self.output.getvalue(),
+            'pending': pending,
+            'resume': {
+                'offset': self.body_offset + len(self.body),
+                'after': self.body[-40:],
+                'open': self._open_structures(pending),
+            },
+        }
+
+    @classmethod
+    def resume(cls, checkpoint, continuation, context=None):
+        """
+        Rebuilds a decoder from checkpoint() output with `continuation` appended.
+
+        The header and already decoded prefix are not parsed again. Call decode()
+        to finish, or decode_partial() if the continuation may be cut off too.
+        """
+        if checkpoint.get('format') != CHECKPOINT_FORMAT:
+            raise CodeQuiltDecodeError(f"Unsupported checkpoint format: {checkpoint.get('format')}")
+        decoder = cls("", context)
+        if checkpoint['spec_version'] != decoder.context.spec_version:
+            raise CodeQuiltDecodeError(f"Checkpoint was made with spec {checkpoint['spec_version']}, "
+                                       f"this decoder implements {decoder.context.spec_version}")
+        header = checkpoint['header']
+        decoder._use_header(QuiltHeader(header['fields'], header['dynamic_map'], header['literal_map'],
+                                        header['options'], header['literal_threshold'], header['keep_comments']))
+        decoder.body = checkpoint['pending'] + continuation
+        decoder.body_offset = checkpoint['body_offset']
+        decoder.output.write(checkpoint['output'])
+        decoder.last_char = checkpoint['output'][-1:]
+        decoder.indent_level = checkpoint['indent_level']
+        decoder.needs_indent = checkpoint['needs_indent']
+        decoder._started = True
+        return decoder
+
+
+# --- Concurrent Decoding ---
+
+def decode_many(codequilt_strings, max_workers=None, context=None, format_code=True):
+    """
+    Decodes several quilts on a thread pool; results keep the input order.
+
+    All workers share one immutable DecodeContext and each call gets its own
+    cursor, so this is safe on free-threaded (no-GIL) builds, where it scales
+    with cores. Errors are re-raised as they would be from decode().
+    """
+    context = context or default_context()
+    def decode_one(codequilt_string):
+        return CodeQuiltDecoder(codequilt_string, context).decode(format_code=format_code)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(decode_one, codequilt_strings))
+
+# --- Intra-file Parallel Decoding ---
+# One very large quilt is cut where a line starts at indent level 0, outside any
+# bracket, string, escape hatch or semantic token. Serial decoding is always in the
+# same state there (level 0, at line start, just after '\n'), so each segment can
+# be decoded on its own in a worker process from the shared header maps and the
+# outputs concatenated. Indentation inside semantic bodies is not tracked by the
+# pre-scan; a wrong guess shows up as a segment that does not end in that state,
+# and the quilt is then decoded serially, so the result always equals decode().
+
+DEFAULT_SEGMENT_SIZE = 1 << 18 # Minimum body characters per segment
+SEGMENT_EDGE_STATE = (0, True, '\n') # (indent_level, needs_indent, last_char) at a boundary
+RE_SEGMENT_EVENT = re.compile(r"[A-Z][A-Z0-9_]*|['\"()\[\]{}]|l\d+")
+RE_LINE_INDENT = re.compile(r"[\s<>]*")
+RE_QUOTED = {quote: re.compile(f"{quote}[^{quote}\\\\]*(?:\\\\.[^{quote}\\\\]*)*{quote}", re.DOTALL) for quote in "'\""}
+RE_TOP_LEVEL_DEF = re.compile(r"^(?:@|def |async def |class )", re.MULTILINE)
+
+def _apply_line_indent(body, pos, level):
+    """Applies the >/< tokens opening a line; returns (first token position, level)."""
+    end = RE_LINE_INDENT.match(body, pos).end()
+    for char in body[pos:end]:
+        if char == '>':
+            level += 1
+        elif char == '<' and level > 0:
+            level -= 1
+    return end, level
+
+def find_segment_boundaries(body, quilt_header, context=None, segment_size=DEFAULT_SEGMENT_SIZE):
+    """
+    Pre-scans a body for top-level statement starts at least `segment_size` apart.
+
+    Only the characters the lexer branches on are visited (names, quotes,
+    brackets and comment refs), so this is much cheaper than lexing.
+    """
+    context = context or default_context()
+    boundaries = []
+    stack = [] # Open brackets; a semantic token is its name
+    in_semantic = 0
+    level = 0
+    pos = 0
+
+    def line_start(line_pos):
+        nonlocal level
+        first, level = _apply_line_indent(body, line_pos, level)
+        last = boundaries[-1] if boundaries else 0
+        if level == 0 and not stack and first - last >= segment_size and first < len(body):
+            boundaries.append(first)
+
+    while True:
+        event_match = RE_SEGMENT_EVENT.search(body, pos)
+        if event_match is None:
+            break
+        event, start, pos = event_match.group(0), event_match.start(), event_match.end()
+
+        if event in RE_QUOTED:
+            quoted = RE_QUOTED[event].match(body, start)
+            if quoted is None:
+                break # Unterminated string: nothing after it is a safe boundary
+            pos = quoted.end()
+        elif event[0] == 'l':
+            value = quilt_header.literal_map.get(event, '')
+            if quilt_header.keep_comments and value.strip().startswith('#') and not in_semantic:
+                line_start(pos)
+        elif event in BRACKET_PAIRS:
+            stack.append(event)
+        elif event in ')]}':
+            opener = stack.pop() if stack else ''
+            if len(opener) > 1:
+                in_semantic -= 1
+                signature = context.semantic_signatures.get(opener)
+                if not in_semantic and signature and signature[3]: # Expansion ends its line
+                    line_start(pos)
+        else:
+            # A run of capitals: the same choices _parse_next_token() makes at each position
+            semantic_at = None
+            if body.startswith('(', pos):
+                for i in range(max(0, len(event) - 32), len(event) - 1):
+                    if event[i].isalpha() and event[i:] in context.semantic_names:
+                        semantic_at = i
+                        break
+            singles = event if semantic_at is None else event[:semantic_at]
+            if not in_semantic:
+                for i, char in enumerate(singles):
+                    if char == 'N':
+                        line_start(start + i + 1)
+            if semantic_at is not None:
+                stack.append(event[semantic_at:])
+                in_semantic += 1
+                pos += 1 # Past '('
+            elif event.endswith('L') and body.startswith("'{", pos):
+                if context.parser == 'table': # Escaped braces may precede the "}'" that ends the hatch
+                    hatch = context.token_patterns['escape_hatch'].match(body, pos - 1)
+                    hatch_end = hatch.end() - 2 if hatch else -1
+                else:
+                    hatch_end = body.find("}'", pos + 2)
+                if hatch_end >= 0:
+                    pos = hatch_end + 2
+    return boundaries
+
+_segment_worker = None # (DecodeContext, QuiltHeader) in a decode_parallel() worker process
+
+def _init_segment_worker(context_tables, header_maps):
+    """Process-pool initializer: rebuilds the context and header once per worker."""
+    global _segment_worker
+    _segment_worker = (DecodeContext(*context_tables), QuiltHeader(*header_maps))
+
+def _decode_segment(segment, first):
+    """Decodes one segment from the boundary state; returns (code, end state)."""
+    context, quilt_header = _segment_worker
+    decoder = CodeQuiltDecoder("", context)
+    decoder._use_header(quilt_header)
+    decoder.body = segment
+    decoder.needs_indent = True
+    decoder.last_char = '' if first else '\n'
+    decoder._started = True
+    code = decoder.decode(format_code=False)
+    return code, (decoder.indent_level, decoder.needs_indent, decoder.last_char)
+
+def format_python_chunks(code_string, max_workers=None):
+    """
+    format_python_code() run per group of top-level def/class blocks on a thread pool.
+
+    Black puts exactly two blank lines before a top-level def/class, so the
+    formatted groups are joined that way. Code is only cut before a def/class/@
+    line that does not follow a decorator, a comment or a one-line stub; if any
+    group fails to format on its own, the whole file is formatted instead.
+    """
+    cuts = [0]
+    for match in RE_TOP_LEVEL_DEF.finditer(code_string):
+        previous = code_string[:match.start()].rstrip().rpartition('\n')[2]
+        if previous and not previous.startswith(('@', '#')) and not previous.endswith(': ...'):
+            cuts.append(match.start())
+    workers = max_workers or os.cpu_count() or 1
+    group_size = len(code_string) // (2 * workers) + 1
+    starts = [0]
+    for cut in cuts[1:]:
+        if cut - starts[-1] >= group_size:
+            starts.append(cut)
+    if len(starts) < 2:
+        return format_python_code(code_string)
+    groups = [code_string[a:b] for a, b in zip(starts, starts[1:] + [len(code_string)])]
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool: # Each black run is its own process
+            formatted = list(pool.map(lambda group: format_python_code(group, raise_errors=True), groups))
+    except (OSError, subprocess.SubprocessError):
+        return format_python_code(code_string)
+    return "\n\n\n".join(group.rstrip('\n') for group in formatted) + "\n"
+
+def decode_parallel(codequilt_string, max_workers=None, context=None, format_code=True,
+                    segment_size=DEFAULT_SEGMENT_SIZE):
+    """
+    Decodes one large quilt in parallel segments; the result equals decode().
+
+    The body is cut at top-level statements (find_segment_boundaries()), the
+    segments are decoded on a process pool that parses nothing but its own
+    segment, and the outputs are stitched in order. Formatting runs per
+    top-level block (format_python_chunks()). Quilts too small to split, and
+    segmentations that turn out wrong, are decoded serially.
+    """
+    context = context or default_context()
+    decoder = CodeQuiltDecoder(codequilt_string, context)
+    decoder._start()
+    boundaries = find_segment_boundaries(decoder.body, decoder.quilt_header, context, segment_size)
+    if not boundaries:
+        return decoder.decode(format_code=format_code)
+
+    edges = [0] + boundaries + [len(decoder.body)]
+    segments = [decoder.body[a:b] for a, b in zip(edges, edges[1:])]
+    quilt_header = decoder.quilt_header
+    context_tables = (context.spec_version, dict(context.corpus), dict(context.fixed_tokens),
+                      dict(context.semantic_templates), set(context.semantic_names), context.parser)
+    header_maps = (dict(quilt_header.fields), dict(quilt_header.dynamic_map), dict(quilt_header.literal_map),
+                   dict(quilt_header.options), quilt_header.literal_threshold, quilt_header.keep_comments)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_segment_worker,
+                                 initargs=(context_tables, header_maps)) as pool:
+            results = list(pool.map(_decode_segment, segments, [i == 0 for i in range(len(segments))]))
+    except CodeQuiltDecodeError:
+        results = None # decode() below raises it again, with whole-body positions
+    if results is None or any(state != SEGMENT_EDGE_STATE for _, state in results[:-1]):
+        return decoder.decode(format_code=format_code)
+
+    code = "".join(segment_code for segment_code, _ in results)
+    if not format_code:
+        return code
+    return format_python_chunks(code, max_workers)
 
 # --- Helper Functions (Mostly from original, adapted slightly) ---
 
-def format_python_code(code_string):
-    """Formats Python code using black, if available."""
+def estimate_tokens(text):
+    """Rough LLM token estimate for size reports (no tokenizer dependency)."""
+    # BPE-ish: letter runs ~4 chars/token, digit runs ~3 digits/token,
+    # every other non-space character is its own token.
+    total = 0
+    for match in RE_TOKEN_ESTIMATE.finditer(text):
+        chunk = match.group(0)
+        if chunk[0].isalpha():
+            total += (len(chunk) + 3) // 4
+        elif chunk[0].isdigit():
+            total += (len(chunk) + 2) // 3
+        else:
+            total += 1
+    return total
+
+_found_black = None # Path of the black that worked last; probing it costs a subprocess per call
+
+def format_python_code(code_string, raise_errors=False):
+    """Formats Python code using black, if available (raise_errors: raise instead of warning)."""
+    global _found_black
     try:
         # Try finding black relative to the current Python executable first
         py_executable = sys.executable
@@ -783,8 +1722,8 @@ def format_python_code(code_string):
             'black' # Fallback to PATH
         ]
 
-        found_black = None
-        for bp in black_paths:
+        found_black = _found_black
+        for bp in black_paths if found_black is None else []:
             try:
                 # Check if path exists and is executable
                  if os.path.isfile(bp) and os.access(bp, os.X_OK):
@@ -801,10 +1740,13 @@ def format_python_code(code_string):
                 subprocess.run(['black', '--version'], capture_output=True, check=True, timeout=2)
                 found_black = 'black'
             except (FileNotFoundError, PermissionError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+                 if raise_errors:
+                     raise
                  print("Warning: 'black' formatter not found or executable. Output may not be perfectly formatted.", file=sys.stderr)
                  return code_string
 
 
+        _found_black = found_black
         process = subprocess.run(
             [found_black, '--quiet', '-'], # Use found path
             input=code_string.encode('utf-8'),
@@ -814,17 +1756,25 @@ def format_python_code(code_string):
         )
         return process.stdout.decode('utf-8')
     except FileNotFoundError: # Should be caught above, but as fallback
+        if raise_errors:
+            raise
         print("Warning: 'black' formatter not found. Output may not be perfectly formatted.", file=sys.stderr)
         return code_string
     except subprocess.TimeoutExpired:
+         if raise_errors:
+             raise
          print("Warning: 'black' formatter timed out. Returning unformatted code.", file=sys.stderr)
          return code_string
     except subprocess.CalledProcessError as e:
+        if raise_errors:
+            raise
         print(f"Warning: 'black' formatter failed:\n--- Formatter Stderr ---\n{e.stderr.decode()}\n--- End Stderr ---", file=sys.stderr)
         # Optionally return the original code OR the potentially broken formatted code
         # Returning original is safer if black fails badly
         return code_string # Return original on failure
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"Warning: Error running 'black': {e}", file=sys.stderr)
         return code_string
 
@@ -862,8 +1812,19 @@ def main():
         description="Convert CodeQuilt (.cq) files to Python (.py) using CodeQuilt Spec v0.7.1.",
         epilog=f"Based on CodeQuilt Spec {SPEC_VERSION}. Note: .py -> .cq conversion is NOT IMPLEMENTED."
     )
-    parser.add_argument("input_file", help="Path to the input CodeQuilt file (.cq)")
+    parser.add_argument("input_file", help="Path to the input CodeQuilt file (.cq, or .cqb for a binary quilt)")
     parser.add_argument("-o", "--output", help="Path to the output Python file (.py). If omitted, derived from input name.")
+    parser.add_argument("--validate", action="store_true",
+                        help="Only check that the quilt is well-formed (refs, brackets, indentation, arity, V:); no output.")
+    parser.add_argument("--templates", help="JSON file of extra semantic token templates (e.g. from mine_semantics.py --json).")
+    parser.add_argument("--backend", choices=["text", "ast"], default="text",
+                        help="text: token writer + black (default); ast: build an AST and render with ast.unparse.")
+    parser.add_argument("--partial", action="store_true",
+                        help="Input may be truncated: decode complete statements and write a JSON checkpoint (-o, default <input>.ckpt.json).")
+    parser.add_argument("--resume", metavar="CHECKPOINT",
+                        help="Treat the input file as the continuation of the quilt saved in CHECKPOINT.")
+    parser.add_argument("--parser", choices=PARSERS, default=DEFAULT_PARSER,
+                        help="table: parser generated from the EBNF grammar by gen_parser.py (default); hand: the original hand-written lexer.")
     # Add verbosity or strictness flags if needed
 
     args = parser.parse_args()
@@ -876,19 +1837,57 @@ def main():
     base, ext = os.path.splitext(input_path)
     ext = ext.lower()
 
-    if ext != '.cq':
-        print(f"Error: Input file must have a .cq extension for decoding.", file=sys.stderr)
+    if ext not in ('.cq', '.cqb') and not args.resume: # A continuation chunk has no header and any name
+        print(f"Error: Input file must have a .cq or .cqb extension for decoding.", file=sys.stderr)
         sys.exit(1)
 
-    output_path = args.output if args.output else base + ".py"
+    output_path = args.output if args.output else base + (".ckpt.json" if args.partial else ".py")
     result_content = None
+    decoder = None
 
     try:
-        print(f"Converting CodeQuilt (.cq) to Python (.py)...")
-        with open(input_path, 'r', encoding='utf-8') as f:
-            input_content = f.read()
+        if args.templates:
+            names = load_semantic_templates(args.templates)
+            print(f"Loaded {len(names)} semantic template(s) from {args.templates}")
+        if ext == '.cqb' and not args.resume: # Binary quilt (quilt_binary.py): decoded without lexing
+            with open(input_path, 'rb') as f:
+                input_content = f.read()
+        else:
+            with open(input_path, 'r', encoding='utf-8') as f:
+                input_content = f.read()
+        context = DecodeContext(parser=args.parser) # After --templates, so their names are known
+
+        if args.validate:
+            result = CodeQuiltDecoder(input_content, context).validate()
+            if result:
+                print(f"OK: {input_path} is a well-formed CodeQuilt {SPEC_VERSION} file.")
+                sys.exit(0)
+            print(f"INVALID: {input_path} ({len(result.errors)} problem(s))", file=sys.stderr)
+            for error in result.errors:
+                print(f"  - {error}", file=sys.stderr)
+            sys.exit(1)
+
+        if args.resume:
+            with open(args.resume, 'r', encoding='utf-8') as f:
+                decoder = CodeQuiltDecoder.resume(json.load(f), input_content, context)
+        elif args.backend == "ast" and not args.partial: # Checkpoints hold text-backend output
+            from ast_backend import AstQuiltDecoder
+            decoder = AstQuiltDecoder(input_content, context)
+        else:
+            decoder = CodeQuiltDecoder(input_content, context)
 
-        decoder = CodeQuiltDecoder(input_content)
+        if args.partial:
+            checkpoint = decoder.decode_partial()
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(checkpoint, f)
+            resume = checkpoint['resume']
+            print(f"Decoded up to body offset {checkpoint['body_offset']}; checkpoint saved to: {output_path}")
+            print(f"Resume generation at body offset {resume['offset']}, right after: {resume['after']!r}")
+            if resume['open']:
+                print(f"Still open: {' '.join(resume['open'])}")
+            sys.exit(0)
+
+        print(f"Converting CodeQuilt (.cq) to Python (.py)...")
         result_content = decoder.decode()
 
         if output_path and result_content is not None:
@@ -932,4 +1931,6 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    # Let helper modules (e.g. ast_backend) that import `translation` share this module
+    sys.modules.setdefault("translation", sys.modules[__name__])
     main()
\ No newline at end of file